@@ -0,0 +1,190 @@
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from expense_validation import config, rules
+
+# Synthetic expense reports with the layout of the daily export. Every row is
+# built to pass all checks for its department; exception_rate of the rows then
+# get one field broken with a change that always fails a check, and
+# multi_error_rate of those rows get two or three fields broken, so rows carry
+# several exception reasons like the real exports do.
+
+input_file_name = os.path.basename(config.data_file)
+
+reference_values = {
+    "FC_Crop": ["Paddy", "Maize", "Cotton", "Bajra", "Mustard", "Jowar"],
+    "VC_Crop": ["Tomato", "Okra", "Chilli", "Brinjal", "Cucumber", "Bitter Gourd"],
+    "Fruit_Crop": ["Mango", "Papaya", "Guava"],
+    "Common_Crop": ["Common Crop"],
+    "Root Stock_Crop": ["Rootstock Tomato", "Rootstock Brinjal"],
+    "SBFC_Region": ["FC Region North", "FC Region South", "FC Region East"],
+    "SBVC_Region": ["VC Region North", "VC Region West"],
+    "SBRS_Region": ["RS Region Central"],
+    "SaleFC_Zone": ["FC Zone 1", "FC Zone 2", "FC Zone 3"],
+    "SaleVC_Zone": ["VC Zone 1", "VC Zone 2"],
+    "SaleRS_Zone": ["RS Zone 1"],
+    "FC_BU": ["FC BU Maharashtra", "FC BU Telangana"],
+    "VC_BU": ["VC BU Karnataka", "VC BU Gujarat"],
+    "RS_BU": ["RS BU Central"],
+    "ProductionFC_Zone": ["Production FC Zone A", "Production FC Zone B"],
+    "ProductionVC_Zone": ["Production VC Zone A"],
+    "SalesActivity": ["All Activity", "Farmer Meeting", "Field Day", "Dealer Meet"],
+    "MarketingActivity": ["All Activity", "Campaign", "Product Launch"],
+    "Region_Excluded_Accounts": [410001, 410002, 410003],
+    "Zone_Excluded_Accounts": [410001, 410004],
+}
+
+input_columns = [
+    "Date", "Department.Name", "Sub Department.Name", "Function.Name", "FC-Vertical.Name",
+    "Location.Name", "Crop.Name", "Activity.Name", "Region.Name", "Zone.Name",
+    "Business Unit.Name", "Account.Code", "Net amount", "Created user", "Modified user",
+    "Created date", "Modified date",
+]
+
+crop_verticals = {
+    "FC-field crop": "FC_Crop",
+    "VC-Veg Crop": "VC_Crop",
+    "Fruit Crop": "Fruit_Crop",
+    "Common": "Common_Crop",
+    "Root Stock": "Root Stock_Crop",
+}
+locations = ["Hyderabad", "Bengaluru", "Raipur", "Pune", "Bandamailaram", "Deorjhal", "Boriya"]
+account_codes = [510001, 510002, 520010, 530100, 540200]
+users = ["anita.r", "kiran.m", "suresh.p", "meena.k", "rahul.d"]
+
+# (department, valid sub departments, function, activities); None as the sub
+# department list means the sub department must be blank
+departments = [
+    (dept, subs, func, ["All Activity"]) for dept, (subs, func) in rules.standard_dept_checks.items()
+] + [
+    ("Production", ["Commercial Seed Production", "Seed Production Research"], "Supply Chain", ["All Activity"]),
+    ("Processing", ["Processing", "Warehousing", "Project & Maintenance"], "Supply Chain", ["All Activity"]),
+    ("Quality Assurance", ["Field QA", "Lab QC", "Bio Tech Services"], "Supply Chain", ["All Activity"]),
+    ("In Licensing & Procurement", None, "Supply Chain", ["All Activity"]),
+    ("Breeding", None, "Research and Development", ["Breeding", "Trialing", "Pre Breeding", "All Activity"]),
+    ("Breeding Support", [sub for sub, _ in rules.breeding_support_activities], "Research and Development", ["All Activity"]),
+    ("Trialing & PD", None, "Research and Development", ["CT", "Trialing", "RST", "All Activity"]),
+    ("Sales", ["Sales Brand", "Sales Export", "Sales Institutional & Govt"], "Sales and Marketing", reference_values["SalesActivity"]),
+    ("Marketing", ["Business Development", "Digital Marketing", "Product Management"], "Sales and Marketing", reference_values["MarketingActivity"]),
+    ("Management", None, "Management", ["All Activity"]),
+]
+activity_checked = {"Breeding", "Trialing & PD", "Sales", "Marketing", "Breeding Support", "Quality Assurance"}
+
+def valid_row(rng, dept, subs, func, activities):
+    vertical = rng.choice(list(crop_verticals))
+    if dept == "In Licensing & Procurement":
+        vertical = rng.choice(["FC-field crop", "VC-Veg Crop", "Fruit Crop"])
+    sub_dept = rng.choice(subs) if subs else ""
+    row = {
+        "Department.Name": dept,
+        "Sub Department.Name": sub_dept,
+        "Function.Name": func,
+        "FC-Vertical.Name": vertical,
+        "Location.Name": rng.choice(locations[4:] if dept == "Processing" else locations),
+        "Crop.Name": rng.choice(reference_values[crop_verticals[vertical]]),
+        "Activity.Name": rng.choice(activities),
+        "Region.Name": None,
+        "Zone.Name": None,
+        "Business Unit.Name": None,
+        "Account.Code": rng.choice(account_codes),
+    }
+    # Checks that only corrupting one of these fields is guaranteed to fail
+    breakable = ["Location.Name", "Function.Name", "Sub Department.Name"]
+    if dept not in rules.no_crop_check:
+        breakable.append("Crop.Name")
+    if dept in activity_checked or dept not in rules.no_activity_check:
+        breakable.append("Activity.Name")
+    if dept == "Quality Assurance":
+        row["Activity.Name"] = {"Lab QC": "Lab Operations QA", "Field QA": "Field Operations QA", "Bio Tech Services": "Molecular"}[sub_dept]
+    elif dept == "Production" and sub_dept == "Commercial Seed Production":
+        if vertical in ("FC-field crop", "VC-Veg Crop"):
+            row["Zone.Name"] = rng.choice(reference_values["ProductionFC_Zone" if vertical == "FC-field crop" else "ProductionVC_Zone"])
+            breakable.append("Zone.Name")
+        elif vertical == "Common":
+            row["Zone.Name"] = "Common Zone"
+    elif dept == "Sales" and sub_dept == "Sales Brand" and vertical in rules.sales_brand_checks:
+        (bu_key, zone_key, region_key), _ = rules.sales_brand_checks[vertical]
+        row["Business Unit.Name"] = rng.choice(reference_values[bu_key])
+        row["Zone.Name"] = rng.choice(reference_values[zone_key])
+        row["Region.Name"] = rng.choice(reference_values[region_key])
+        breakable += ["Business Unit.Name", "Zone.Name", "Region.Name"]
+    elif dept != "Marketing" and rng.random() < 0.3:
+        # Region and zone filled in where no check looks at them
+        row["Region.Name"] = rng.choice(reference_values["SBFC_Region"])
+        row["Zone.Name"] = rng.choice(reference_values["SaleFC_Zone"])
+        breakable.append("Account.Code")
+    return row, breakable
+
+def break_field(rng, row, field):
+    if field == "Location.Name":
+        row[field] = rng.choice(["ZZ Closed Depot", "-"])
+    elif field == "Function.Name":
+        row[field] = "Operations"
+    elif field == "Sub Department.Name":
+        row[field] = "Unmapped Sub Department"
+    elif field == "Crop.Name":
+        row[field] = rng.choice(["ZZ Discontinued", "-"])
+    elif field == "Activity.Name":
+        row[field] = "ZZ Old Activity"
+    elif field == "Account.Code":
+        row[field] = rng.choice(reference_values["Region_Excluded_Accounts"])
+    else:
+        row[field] = "Unmapped " + field.split(".")[0]
+
+def write_references(input_path):
+    os.makedirs(input_path, exist_ok=True)
+    for key, (file_name, column) in config.reference_sources.items():
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append([column])
+        for value in reference_values[key]:
+            ws.append([value])
+        wb.save(os.path.join(input_path, file_name))
+
+def write_input(path, rows, exception_rate, multi_error_rate, seed):
+    rng = random.Random(seed)
+    start = datetime(2024, 4, 1)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Expense Report")
+    ws.append(input_columns)
+    exception_rows = 0
+    for _ in range(rows):
+        row, breakable = valid_row(rng, *rng.choice(departments))
+        if rng.random() < exception_rate:
+            broken = rng.randint(2, 3) if rng.random() < multi_error_rate else 1
+            for field in rng.sample(breakable, min(broken, len(breakable))):
+                break_field(rng, row, field)
+            exception_rows += 1
+        created = start + timedelta(days=rng.randrange(365), seconds=rng.randrange(86400))
+        row["Date"] = datetime(created.year, created.month, created.day)
+        row["Net amount"] = round(rng.uniform(-5000, 250000), 2)
+        row["Created user"] = rng.choice(users)
+        row["Modified user"] = rng.choice(users)
+        row["Created date"] = created
+        row["Modified date"] = created + timedelta(hours=rng.randrange(72))
+        ws.append([row[column] for column in input_columns])
+    wb.save(path)
+    return exception_rows
+
+def generate_dataset(directory, rows, exception_rate=0.1, multi_error_rate=0.3, seed=0):
+    # Returns the number of rows that were given an exception
+    write_references(os.path.join(directory, "Input file"))
+    return write_input(os.path.join(directory, input_file_name), rows, exception_rate, multi_error_rate, seed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic expense report and its reference workbooks")
+    parser.add_argument("directory")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--exception-rate", type=float, default=0.1)
+    parser.add_argument("--multi-error-rate", type=float, default=0.3,
+                        help="share of the exception rows with two or three broken fields")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    exception_rows = generate_dataset(args.directory, args.rows, args.exception_rate, args.multi_error_rate, args.seed)
+    print(f"Wrote {args.rows} rows ({exception_rows} with exceptions) to {args.directory}")
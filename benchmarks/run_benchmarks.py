@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from expense_validation import config, engine, reader, references, reports, rules
+from generate_data import generate_dataset, input_file_name
+
+benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+default_sizes = [10000, 100000, 1000000]
+
+def configure(data_dir, output_dir):
+    # Point the pipeline's file configuration at a generated dataset
+    config.input_path = os.path.join(data_dir, "Input file")
+    config.data_file = os.path.join(data_dir, input_file_name)
+    config.exception_file = os.path.join(output_dir, "Exception_Report.xlsx")
+    config.summary_file = os.path.join(output_dir, "Exception_Summary_Report.xlsx")
+    config.correction_file = os.path.join(output_dir, "Correction_Entries.xlsx")
+    config.all_depts_file = os.path.join(output_dir, "All_Departments_Output.xlsx")
+    config.common_usage_file = os.path.join(output_dir, "Common_Usage_Report.xlsx")
+    config.reference_cache_file = os.path.join(output_dir, ".reference_cache.pkl")
+    config.validation_state_file = os.path.join(output_dir, ".validation_state.pkl")
+    # read_input is timed parsing the workbook, not loading a snapshot
+    config.input_snapshot_dir = None
+
+def run_stage(stages, name, rows, func, *args):
+    # Wall time and, when tracing, the peak traced allocation of one stage
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    stages.append({
+        "stage": name,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds, 1) if seconds > 0 else None,
+        "peak_bytes": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+    })
+    print(f"  {name:<24} {seconds:9.2f}s", file=sys.stderr)
+    return result
+
+def benchmark_dataset(data_dir, output_dir, rows):
+    configure(data_dir, output_dir)
+    if os.path.exists(config.reference_cache_file):
+        os.remove(config.reference_cache_file)
+    stages = []
+    df = run_stage(stages, "read_input", rows, reader.read_input, config.data_file)
+    input_columns = df.columns.tolist()
+    rules.ref_files = run_stage(stages, "load_references", rows, references.load_reference_data,
+                                config.input_path, config.reference_cache_file)
+    run_stage(stages, "load_references_cached", rows, references.load_reference_data,
+              config.input_path, config.reference_cache_file)
+    dept_dfs, exception_dfs, common_usage_dfs, exception_codes = run_stage(stages, "validate", rows, engine.validate_departments,
+                                                                           df, input_columns, config.validation_workers)
+    for name, path, frames in [
+        ("write_all_departments", config.all_depts_file, dept_dfs),
+        ("write_exception_report", config.exception_file, exception_dfs),
+        ("write_common_usage", config.common_usage_file, common_usage_dfs),
+    ]:
+        sheets = [(str(dept), frame) for dept, frame in frames.items()]
+        run_stage(stages, name, rows, reports.write_report, path, sheets)
+    run_stage(stages, "write_summary_report", rows, reports.write_summary_report, exception_dfs, config.summary_file,
+              exception_codes)
+    correction_entries = run_stage(stages, "build_correction_entries", rows, reports.build_correction_entries,
+                                   exception_dfs, input_columns)
+    run_stage(stages, "write_correction_entries", rows, reports.write_report,
+              config.correction_file, [('Correction Entries', correction_entries)])
+    exception_rows = sum(len(frame) for frame in exception_dfs.values())
+    return {
+        "rows": rows,
+        "exception_rows": exception_rows,
+        "departments": len(dept_dfs),
+        "total_seconds": round(sum(stage["seconds"] for stage in stages), 4),
+        "stages": stages,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of the validation pipeline on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=default_sizes)
+    parser.add_argument("--exception-rate", type=float, default=0.1)
+    parser.add_argument("--multi-error-rate", type=float, default=0.3,
+                        help="share of the exception rows with two or three broken fields")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(benchmark_dir, "data"),
+                        help="generated datasets are kept here and reused across runs")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--workers", type=int, default=config.validation_workers,
+                        help="validation and input read workers; forked workers are not traced")
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="skip peak memory tracing, which slows down pure Python stages")
+    args = parser.parse_args()
+
+    config.validation_workers = args.workers
+    config.input_read_workers = args.workers
+    started = datetime.now()
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+    results = []
+    for rows in args.sizes:
+        data_dir = os.path.join(args.data_dir, f"rows-{rows}-rate-{args.exception_rate}-multi-{args.multi_error_rate}-seed-{args.seed}")
+        if not os.path.exists(os.path.join(data_dir, input_file_name)):
+            print(f"Generating {rows} rows in {data_dir}", file=sys.stderr)
+            generate_dataset(data_dir, rows, args.exception_rate, args.multi_error_rate, args.seed)
+        output_dir = os.path.join(data_dir, "output")
+        os.makedirs(output_dir, exist_ok=True)
+        print(f"Benchmarking {rows} rows", file=sys.stderr)
+        results.append(benchmark_dataset(data_dir, output_dir, rows))
+    tracemalloc.stop()
+
+    report = {
+        "started": started.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "workers": args.workers,
+        "tracemalloc": not args.no_tracemalloc,
+        "validation_engine": config.validation_engine,
+        "input_reader": config.input_reader,
+        "exception_rate": args.exception_rate,
+        "multi_error_rate": args.multi_error_rate,
+        "seed": args.seed,
+        "results": results,
+    }
+    output = args.output or os.path.join(benchmark_dir, "results", started.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import importlib
+
+# The pipeline API is resolved on first use, so importing the package (or
+# running a preflight) does not import pandas, numpy or openpyxl:
+#
+#   from expense_validation import config, load_references, validate, write_reports
+#   load_references()
+#   write_reports(validate("Expense_Report.xlsx"))
+api = {
+    "ValidationResult": "pipeline",
+    "load_references": "pipeline",
+    "validate": "pipeline",
+    "load_exception_report": "pipeline",
+    "write_reports": "pipeline",
+    "run_pipeline": "pipeline",
+    "stream_reports": "streaming",
+    "main": "cli",
+}
+
+def __getattr__(name):
+    if name in api:
+        value = getattr(importlib.import_module(f".{api[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
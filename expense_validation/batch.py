@@ -0,0 +1,48 @@
+import os
+import glob
+import time
+import datetime
+
+from . import config
+from .pipeline import run_pipeline
+
+def process_file(job):
+    # Validates one input file into its own report directory, recording its
+    # history under run_date (None: history_run_date, or today); returns
+    # (input file, report directory, seconds, error message or None)
+    path, output_dir, run_date = job
+    start = time.perf_counter()
+    try:
+        config.data_file = path
+        config.history_run_date = run_date
+        os.makedirs(output_dir, exist_ok=True)
+        config.set_output_dir(output_dir)
+        run_pipeline()
+    except Exception as e:
+        return path, output_dir, time.perf_counter() - start, str(e)
+    return path, output_dir, time.perf_counter() - start, None
+
+def find_input_files(patterns, dates, input_dir, date_pattern, output_dir, run_date=None):
+    # Returns (input file, report directory, run date) jobs. Files of a date
+    # range get a directory per date and that date as their run date, other
+    # files one directory per file name and run_date
+    jobs = []
+    if dates:
+        day, last = dates
+        while day <= last:
+            for path in sorted(glob.glob(os.path.join(input_dir, date_pattern.format(date=day)))):
+                jobs.append((path, os.path.join(output_dir, day.isoformat()), day.isoformat()))
+            day += datetime.timedelta(days=1)
+    for pattern in patterns:
+        paths = sorted(glob.glob(pattern)) or [pattern]
+        for path in paths:
+            if not os.path.isfile(path):
+                raise ValueError(f"Input file {path} not found")
+            name = os.path.splitext(os.path.basename(path))[0]
+            report_dir = os.path.join(output_dir, name)
+            count = 1
+            while any(report_dir == existing for _, existing, _ in jobs):
+                count += 1
+                report_dir = os.path.join(output_dir, f"{name}-{count}")
+            jobs.append((path, report_dir, run_date))
+    return jobs
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import argparse
+import datetime
+import cProfile
+
+from . import config
+from .batch import process_file, find_input_files
+from .parallel import fork_pool
+from .pipeline import load_references, run_pipeline
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Validate expense reports and write the exception, summary and correction reports")
+    parser.add_argument("inputs", nargs="*", help="input reports or glob patterns; without inputs or --dates the configured data_file is validated")
+    parser.add_argument("--dates", nargs=2, metavar=("FROM", "TO"), type=datetime.date.fromisoformat,
+                        help="validate the daily files from FROM to TO (YYYY-MM-DD) found with --date-pattern")
+    parser.add_argument("--input-dir", default=config.base_path, help="directory the --date-pattern is resolved in")
+    parser.add_argument("--date-pattern", default=os.path.join("{date:%Y-%m-%d}", os.path.basename(config.data_file)),
+                        help="glob of a day's input files, formatted with date (default: %(default)s)")
+    parser.add_argument("--output-dir", help="each input gets its own report directory here, next to the reference cache "
+                                             "and input snapshots; without inputs the reports go here "
+                                             "(default: base_path, or Reports in the watched folder)")
+    parser.add_argument("--reference-dir", default=config.input_path, help="directory of the reference workbooks")
+    parser.add_argument("--workers", type=int, default=1, help="input files processed concurrently (default: one after another)")
+    parser.add_argument("--watch", action="store_true",
+                        help="run as a service that validates every workbook dropped into --input-dir")
+    parser.add_argument("--poll-seconds", type=float, default=config.service_poll_seconds, help="how often the watched folder is scanned")
+    parser.add_argument("--status-port", type=int, default=config.service_status_port,
+                        help="port of the local JSON status endpoint; 0 disables it")
+    parser.add_argument("--process-existing", action="store_true",
+                        help="also validate the workbooks already in the watched folder at startup")
+    parser.add_argument("--stream", action="store_true",
+                        help="validate in chunks within the configured streaming_memory_budget, for inputs too large for memory")
+    parser.add_argument("--run-date", type=datetime.date.fromisoformat,
+                        help="date (YYYY-MM-DD) the inputs' exceptions are recorded under in the history store "
+                             "(default: today, or each file's date with --dates)")
+    parser.add_argument("--history", nargs=2, metavar=("FROM", "TO"), type=datetime.date.fromisoformat,
+                        help="only write the summary of the runs dated FROM to TO from the history store")
+    parser.add_argument("--history-file", default=config.history_file,
+                        help="SQLite store every run's exceptions are appended to (default: history_file)")
+    parser.add_argument("--preflight", action="store_true",
+                        help="only check the inputs' headers and that the reference workbooks are present, then exit")
+    return parser.parse_args(argv)
+
+def run_preflight(args):
+    # Reads nothing but the header rows, so it needs neither pandas nor openpyxl
+    from .preflight import input_problems, reference_problems
+    if args.inputs or args.dates:
+        try:
+            paths = [path for path, _, _ in find_input_files(args.inputs, args.dates, args.input_dir, args.date_pattern, "")]
+        except ValueError as e:
+            raise SystemExit(str(e))
+    else:
+        paths = [config.data_file]
+    problems = reference_problems(args.reference_dir)
+    for path in paths:
+        path_problems = input_problems(path)
+        if not path_problems:
+            print(f"{path}: OK")
+        problems += path_problems
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if problems:
+        raise SystemExit(f"Preflight found {len(problems)} problem(s)")
+
+def run_history_summary(args):
+    # Adds up the stored totals of the runs in the range; no input is read
+    from .history import connect_history, history_runs, history_summary
+    from .reports import write_summary
+    if args.history_file is None:
+        raise SystemExit("No history store configured; set history_file or pass --history-file")
+    first, last = (day.isoformat() for day in args.history)
+    connection = connect_history(args.history_file)
+    try:
+        runs, exceptions = history_runs(connection, first, last)
+        start = time.perf_counter()
+        summary = history_summary(connection, first, last)
+        query_seconds = time.perf_counter() - start
+    finally:
+        connection.close()
+    output_dir = args.output_dir or config.base_path
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f"Exception_History_Summary_{first}_{last}.xlsx")
+    write_summary(*summary, output_file)
+    print(f"{output_file}: {exceptions} exceptions in {runs} runs (query {query_seconds * 1000:.0f} ms)")
+
+def run(args):
+    if args.preflight:
+        run_preflight(args)
+        return
+    config.history_file = args.history_file
+    if args.history:
+        run_history_summary(args)
+        return
+    if args.run_date:
+        config.history_run_date = args.run_date.isoformat()
+    if args.stream:
+        config.streaming_validation = True
+    config.input_path = args.reference_dir
+    if args.watch:
+        from .service import watch_folder
+        output_dir = args.output_dir or os.path.join(args.input_dir, "Reports")
+        config.set_cache_dir(output_dir)
+        watch_folder(args.input_dir, output_dir, args.poll_seconds, args.status_port, args.process_existing)
+        return
+    # The reference cache and input snapshots go with the reports
+    if args.output_dir:
+        config.set_cache_dir(args.output_dir)
+    if not args.inputs and not args.dates:
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            config.set_output_dir(args.output_dir)
+        run_pipeline()
+        return
+    jobs = find_input_files(args.inputs, args.dates, args.input_dir, args.date_pattern, args.output_dir or config.base_path,
+                            config.history_run_date)
+    if not jobs:
+        raise ValueError("No input files matched the given inputs or date range")
+
+    # References are loaded once and shared by every file
+    load_references()
+    pool = fork_pool(min(args.workers, len(jobs)))
+    if pool is None:
+        results = map(process_file, jobs)
+    else:
+        # Files already run in parallel, so each one is read, validated and written serially
+        config.validation_workers = 1
+        config.input_read_workers = 1
+        config.report_workers = 1
+        with pool:
+            results = list(pool.map(process_file, jobs))
+    failed = 0
+    for path, output_dir, seconds, error in results:
+        if error is None:
+            print(f"{path} -> {output_dir} ({seconds:.1f}s)")
+        else:
+            failed += 1
+            print(f"{path} failed after {seconds:.1f}s: {error}", file=sys.stderr)
+    if failed:
+        raise SystemExit(f"{failed} of {len(jobs)} input files failed")
+
+def main(argv=None):
+    # Entry point of validation.py, python -m expense_validation and the
+    # expense-validation script
+    args = parse_args(argv)
+    if config.profile_file is None:
+        run(args)
+    else:
+        profiler = cProfile.Profile()
+        profiler.runcall(run, args)
+        profiler.dump_stats(config.profile_file)
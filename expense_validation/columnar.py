@@ -0,0 +1,121 @@
+import pandas as pd
+import os
+import json
+import shutil
+from urllib.parse import quote
+
+from . import config
+from .reports import write_report, correction_columns
+
+columnar_extensions = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+columnar_manifest = "_manifest.json"
+
+def import_pyarrow():
+    # pyarrow is only needed for parquet and arrow output
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError(f"output_format '{config.output_format}' needs pyarrow; install it or use output_format = 'csv'")
+    return pyarrow
+
+def columnar_frame(frame):
+    # Mixed object columns (from the row engine or the input) are written as
+    # text; categorical input columns keep their dtype with text categories
+    frame = frame.infer_objects()
+    for column in frame.columns:
+        if column == 'Exception Reasons':
+            continue
+        if frame[column].dtype == object:
+            frame[column] = frame[column].map(lambda value: value if pd.isna(value) else str(value))
+        elif isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype(object).map(lambda value: value if pd.isna(value) else str(value)).astype("category")
+    return frame
+
+def write_columnar_dataset(path, frames, file_format):
+    # One file per department; every file shares the schema of the combined
+    # frame, so the directory loads as a single dataset
+    if os.path.isdir(path + ".tmp"):
+        shutil.rmtree(path + ".tmp")
+    os.makedirs(path + ".tmp")
+    combined = columnar_frame(pd.concat(list(frames.values()), ignore_index=True)) if frames else pd.DataFrame()
+    if 'Exception Reasons' in combined.columns and file_format != "csv":
+        # Reasons are stored as a list column
+        combined['Exception Reasons'] = combined['Exception Reasons'].str.split("; ")
+    if file_format != "csv":
+        pyarrow = import_pyarrow()
+        table = pyarrow.Table.from_pandas(combined, preserve_index=False)
+    files = []
+    offset = 0
+    for dept, frame in frames.items():
+        file_name = quote(str(dept), safe=" &") + columnar_extensions[file_format]
+        file_path = os.path.join(path + ".tmp", file_name)
+        if file_format == "csv":
+            combined.iloc[offset:offset + len(frame)].to_csv(file_path, index=False)
+        elif file_format == "parquet":
+            pyarrow.parquet.write_table(table.slice(offset, len(frame)), file_path)
+        else:
+            pyarrow.feather.write_feather(table.slice(offset, len(frame)), file_path)
+        files.append({"department": str(dept), "file": file_name, "rows": len(frame)})
+        offset += len(frame)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(path + ".tmp", path)
+    return {"files": files, "dtypes": {column: str(dtype) for column, dtype in combined.dtypes.items()}}
+
+def write_columnar_output(directory, datasets, input_columns, file_format):
+    # datasets: name -> {department: frame}; the manifest keeps the department
+    # order and dtypes needed to rebuild the workbooks
+    if file_format not in columnar_extensions:
+        raise ValueError(f"Unknown output_format '{file_format}'. Expected 'excel' or one of {list(columnar_extensions)}")
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"format": file_format, "input_columns": input_columns, "datasets": {}}
+    for name, frames in datasets.items():
+        manifest["datasets"][name] = write_columnar_dataset(os.path.join(directory, name), frames, file_format)
+    tmp_file = os.path.join(directory, columnar_manifest + ".tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, os.path.join(directory, columnar_manifest))
+
+def read_columnar_dataset(directory, name, manifest):
+    # Returns {department: frame} in the order the departments were written
+    dataset = manifest["datasets"][name]
+    frames = {}
+    for entry in dataset["files"]:
+        file_path = os.path.join(directory, name, entry["file"])
+        if manifest["format"] == "csv":
+            dtypes = dataset["dtypes"]
+            text_columns = {column: "str" for column, dtype in dtypes.items() if dtype in ("str", "object", "category")}
+            date_columns = [column for column, dtype in dtypes.items() if dtype.startswith("datetime")]
+            frame = pd.read_csv(file_path, dtype=text_columns, parse_dates=date_columns, keep_default_na=False, na_values=[""])
+        else:
+            import_pyarrow()
+            if manifest["format"] == "parquet":
+                frame = pd.read_parquet(file_path)
+            else:
+                frame = pd.read_feather(file_path)
+            if 'Exception Reasons' in frame.columns:
+                frame['Exception Reasons'] = frame['Exception Reasons'].map("; ".join)
+        frames[entry["department"]] = frame
+    return frames
+
+def split_by_department(frame):
+    return {dept: group for dept, group in frame.groupby('Department.Name', sort=False)}
+
+def write_excel_from_columnar(directory):
+    # Builds the four workbooks from an earlier run's columnar output
+    try:
+        with open(os.path.join(directory, columnar_manifest)) as f:
+            manifest = json.load(f)
+    except OSError as e:
+        raise ValueError(f"No columnar output found in {directory}: {str(e)}")
+    rows = 0
+    for name, path in [("all_departments", config.all_depts_file), ("exceptions", config.exception_file), ("common_usage", config.common_usage_file)]:
+        frames = read_columnar_dataset(directory, name, manifest)
+        write_report(path, [(str(dept), frame) for dept, frame in frames.items()])
+        rows += sum(map(len, frames.values()))
+    frames = read_columnar_dataset(directory, "correction_entries", manifest)
+    correction_entries = pd.concat(list(frames.values()), ignore_index=True) if frames else pd.DataFrame(columns=correction_columns(manifest["input_columns"]))
+    write_report(config.correction_file, [('Correction Entries', correction_entries)])
+    return rows + len(correction_entries)
@@ -0,0 +1,161 @@
+import os
+
+# Settings shared by every stage. Edit them here, or assign the attributes
+# (expense_validation.config.data_file = ...) before calling the pipeline API
+
+# File path configuration
+base_path = "/home/vnrfinance/Downloads/Testing/Daily data validation"
+input_path = os.path.join(base_path, "Input file")
+data_file = os.path.join(base_path, "VNR_SEEDS_PRIVATE_LIMITEDActual_Expense_Report.xlsx")
+exception_file = os.path.join(base_path, "Exception_Report.xlsx")
+summary_file = os.path.join(base_path, "Exception_Summary_Report.xlsx")
+correction_file = os.path.join(base_path, "Correction_Entries.xlsx")
+all_depts_file = os.path.join(base_path, "All_Departments_Output.xlsx")
+common_usage_file = os.path.join(base_path, "Common_Usage_Report.xlsx")
+reference_cache_file = os.path.join(base_path, ".reference_cache.pkl")
+# Prepared inputs are kept as Arrow IPC snapshots in input_snapshot_dir (None
+# disables them; they need pyarrow), keyed by a hash of the input file's
+# content, so a rerun on the same file maps its snapshot instead of parsing
+# the workbook. The least recently used snapshots are removed once they take
+# more than input_snapshot_max_bytes
+input_snapshot_dir = os.path.join(base_path, ".input_snapshots")
+input_snapshot_max_bytes = 2 * 1024 * 1024 * 1024
+# Stage, department and rule timings of each run; None skips writing them.
+# Set profile_file to also dump cProfile stats of the whole run
+metrics_file = os.path.join(base_path, "Validation_Metrics.json")
+profile_file = None
+
+# Validation engine: "vectorized" evaluates every check as column-wise masks,
+# "row" runs the reference validate_row path on each row
+validation_engine = "vectorized"
+# Incremental mode stores each row's result keyed by a row fingerprint and only
+# validates new or modified rows and rows touched by a changed reference list;
+# bump RULES_VERSION whenever a check changes so stored results are discarded.
+# The row engine only runs incrementally with memoize_combinations
+incremental_validation = False
+validation_state_file = os.path.join(base_path, ".validation_state.pkl")
+RULES_VERSION = 2
+# Memoized validation groups the rows on the department and the ten checked
+# fields and validates each distinct combination once with validation_engine.
+# Results stay in an LRU of combination_cache_size combinations for the rest
+# of a batch or service run, until other references are loaded
+memoize_combinations = False
+combination_cache_size = 100000
+
+# Departments are validated on this many forked worker processes; 1 runs serially
+validation_workers = os.cpu_count() or 1
+
+# Input reader: "stream" opens the workbook once and parses the sheet XML in
+# row-aligned chunks on input_read_workers processes, "pandas" uses pd.read_excel
+input_reader = "stream"
+input_read_workers = os.cpu_count() or 1
+input_chunk_bytes = 4 * 1024 * 1024
+
+# Streaming mode reads, validates and spools the input in chunks sized to keep
+# the pipeline's data within streaming_memory_budget bytes (the interpreter
+# and imported libraries come on top), then streams the excel reports from the
+# spool in streaming_spool_dir (None: the system temporary directory). It
+# always uses the "stream" reader, writes excel output and validates every
+# row without the incremental state
+streaming_validation = False
+streaming_memory_budget = 512 * 1024 * 1024
+streaming_spool_dir = None
+
+# Every run's exceptions are appended to this SQLite store (None disables it),
+# as the run of history_run_date (YYYY-MM-DD; None is the day of the run).
+# `python validation.py --history FROM TO` writes the summary of a date range
+history_file = None
+history_run_date = None
+
+# Summarize an existing Exception_Report.xlsx instead of validating the input;
+# the summary and correction entries are rebuilt from the report on disk
+summarize_existing_report = False
+
+# Format of All_Departments, Exception_Report, Common_Usage and the correction
+# entries: "excel" writes the styled workbooks, "parquet", "arrow" and "csv"
+# write one file per department under columnar_output_dir instead (parquet
+# and arrow need pyarrow). The workbooks can be built from that output later
+# with excel_from_columnar_output = True, which skips validation
+output_format = "excel"
+columnar_output_dir = os.path.join(base_path, "Columnar output")
+excel_from_columnar_output = False
+
+# Correction_Entries gets a "Suggested Corrections" column naming, for every
+# Crop, Zone, Region, Business Unit and Activity value that is not in its
+# reference list, the closest entry of that list; entries matching less than
+# suggestion_min_similarity of the value (by edit distance) are not suggested
+correction_suggestions = True
+suggestion_min_similarity = 0.6
+
+# Report workbooks hold at most report_sheet_rows data rows per sheet (Excel's
+# limit is 1,048,576 rows with the header); longer departments continue on
+# numbered sheets, and past report_file_cells cells a report continues in
+# numbered files (Exception_Report_2.xlsx, ...). An Index sheet then lists
+# which sheet and file hold each department's rows
+report_sheet_rows = 1048575
+report_file_cells = 50000000
+
+# The report workbooks (and columnar datasets) are written on up to
+# report_workers forked processes at once while the run goes on with the
+# correction entries and the history; 1 writes them one after another. Each
+# workbook is written to a temporary file and renamed into place
+report_workers = os.cpu_count() or 1
+
+# Service mode (--watch): how often the watched folder is scanned and the port
+# of the local JSON status endpoint
+service_poll_seconds = 5
+service_status_port = 8765
+required_columns = ['Department.Name', 'Sub Department.Name']
+# Low-cardinality text columns held as categoricals, so each distinct value is
+# stored once and the checks work on the categories instead of every row
+categorical_columns = [
+    'Department.Name', 'Sub Department.Name', 'Function.Name', 'FC-Vertical.Name', 'Location.Name',
+    'Crop.Name', 'Activity.Name', 'Region.Name', 'Zone.Name', 'Business Unit.Name',
+]
+
+# Reference master lists: key -> (file name under input_path, column)
+reference_sources = {
+    "FC_Crop": ("FC-field crop.xlsx", "Crop.Name"),
+    "VC_Crop": ("VC-Veg Crop.xlsx", "Crop.Name"),
+    "SBFC_Region": ("SBFC-Region.xlsx", "Region.Name"),
+    "SBVC_Region": ("SBVC-Region.xlsx", "Region.Name"),
+    "SaleFC_Zone": ("SaleFC-Zone.xlsx", "Zone.Name"),
+    "SaleVC_Zone": ("SaleVC-Zone.xlsx", "Zone.Name"),
+    "FC_BU": ("FC-BU.xlsx", "Business Unit.Name"),
+    "VC_BU": ("VC-BU.xlsx", "Business Unit.Name"),
+    "Fruit_Crop": ("Fruit Crop.xlsx", "Crop.Name"),
+    "Common_Crop": ("Common crop.xlsx", "Crop.Name"),
+    "ProductionFC_Zone": ("ProductionFC-Zone.xlsx", "Zone.Name"),
+    "ProductionVC_Zone": ("ProductionVC-Zone.xlsx", "Zone.Name"),
+    "SalesActivity": ("SalesActivity.xlsx", "Activity.Name"),
+    "MarketingActivity": ("MarketingActivity.xlsx", "Activity.Name"),
+    "RS_BU": ("RS-BU.xlsx", "Business Unit.Name"),
+    "SaleRS_Zone": ("SaleRS-Zone.xlsx", "Zone.Name"),
+    "SBRS_Region": ("SBRS-Region.xlsx", "Region.Name"),
+    "Root Stock_Crop": ("Root Stock Crop.xlsx", "Crop.Name"),
+    "Region_Excluded_Accounts": ("Region.Name excluded.xlsx", "Account.Code"),
+    "Zone_Excluded_Accounts": ("Zone.Name excluded.xlsx", "Account.Code"),
+}
+
+def set_output_dir(output_dir):
+    # Points the report paths and the incremental state at output_dir,
+    # keeping their file names
+    global exception_file, summary_file, correction_file, all_depts_file, common_usage_file
+    global metrics_file, columnar_output_dir, validation_state_file
+    exception_file = os.path.join(output_dir, os.path.basename(exception_file))
+    summary_file = os.path.join(output_dir, os.path.basename(summary_file))
+    correction_file = os.path.join(output_dir, os.path.basename(correction_file))
+    all_depts_file = os.path.join(output_dir, os.path.basename(all_depts_file))
+    common_usage_file = os.path.join(output_dir, os.path.basename(common_usage_file))
+    if metrics_file is not None:
+        metrics_file = os.path.join(output_dir, os.path.basename(metrics_file))
+    columnar_output_dir = os.path.join(output_dir, os.path.basename(columnar_output_dir))
+    validation_state_file = os.path.join(output_dir, os.path.basename(validation_state_file))
+
+def set_cache_dir(cache_dir):
+    # Points the reference cache and the input snapshots, which every input
+    # shares, at cache_dir
+    global reference_cache_file, input_snapshot_dir
+    reference_cache_file = os.path.join(cache_dir, os.path.basename(reference_cache_file))
+    if input_snapshot_dir is not None:
+        input_snapshot_dir = os.path.join(cache_dir, os.path.basename(input_snapshot_dir))
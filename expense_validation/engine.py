@@ -0,0 +1,332 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import time
+import pickle
+import collections
+
+from . import config, rules
+from .metrics import pipeline_metrics
+from .parallel import fork_pool
+from .rules import (validate_row, validate_frame, reason_code, reason_messages, render_reasons, common_usage_mask,
+                    normalize_frame, normalized_columns, rule_metrics, map_distinct, clean_text, is_in)
+
+# (input frame, department row positions, input columns, incremental state,
+# normalized columns) for validation workers
+department_context = None
+
+# Memoized validation: reason bitmasks keyed by department and the values of
+# the checked fields, least recently used first. The cache lives as long as
+# the process, so batch and service runs reuse it across files, and is
+# emptied whenever other references are loaded
+combination_cache = collections.OrderedDict()
+combination_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+combination_cache_references = None
+# (hit keys, new keys, new bitmasks) of the department being validated; forked
+# workers hand them back so the parent process updates the cache
+combination_lookups = ([], [], [])
+combination_key_columns = [column for column in normalized_columns if column != 'Department.Name']
+
+def combination_value(column, values, code):
+    # Cleaned text for the columns the checks clean; the others are compared
+    # as they are, so their type is part of the key and missing values are None
+    if normalized_columns[column] is not None:
+        return values.values[code]
+    value = values.raw[code]
+    if pd.isna(value):
+        return None
+    return (type(value), value)
+
+def combination_ids(normalized, size):
+    # Row -> number of its combination of the checked fields, in order of appearance
+    ids = np.zeros(size, dtype=np.int64)
+    for column in combination_key_columns:
+        values = normalized[column]
+        ids, _ = pd.factorize(ids * len(values.values) + values.codes)
+    return ids
+
+def validate_combinations(dept, dept_df, normalized):
+    # Validates each distinct combination once, with the configured engine,
+    # unless the combination cache holds it, and broadcasts the bitmasks back
+    # to the rows through their combination ids
+    ids = combination_ids(normalized, len(dept_df))
+    first = np.unique(ids, return_index=True)[1]
+    keys = [(dept,) + tuple(combination_value(column, normalized[column], normalized[column].codes[row])
+                            for column in combination_key_columns)
+            for row in first]
+    hits, new_keys, new_codes = combination_lookups
+    combination_codes = np.zeros(len(keys), dtype=np.uint64)
+    missing = []
+    for position, key in enumerate(keys):
+        code = combination_cache.get(key)
+        if code is None:
+            missing.append(position)
+        else:
+            combination_codes[position] = code
+            hits.append(key)
+    rows = first[missing]
+    if config.validation_engine == "row":
+        # The department's check order, from the vectorized checks on no rows;
+        # the bitmasks render in the order validate_row appends the reasons
+        order = validate_frame(dept, dept_df.iloc[:0], {column: values.take(rows[:0]) for column, values in normalized.items()})[1]
+        reason_hits = collections.Counter()
+        for position, (_, row) in zip(missing, dept_df.iloc[rows].iterrows()):
+            reasons = validate_row(dept, row)
+            reason_hits.update(reasons)
+            combination_codes[position] = reason_code(reasons)
+        # Every check of the department ran on each combination validated
+        # here; validate_row does not time its checks, so the order lookup's
+        # timing is dropped
+        for bit in order:
+            metrics = rule_metrics.setdefault(reason_messages[bit], [0, 0, None])
+            metrics[0] += len(rows)
+            metrics[1] += reason_hits[reason_messages[bit]]
+            metrics[2] = None
+    else:
+        combination_codes[missing], order = validate_frame(dept, dept_df.iloc[rows], {column: values.take(rows) for column, values in normalized.items()})
+    new_keys.extend(keys[position] for position in missing)
+    new_codes.extend(combination_codes[missing].tolist())
+    return combination_codes[ids], order
+
+def evaluate_rows(dept, dept_df, normalized):
+    # Reason bitmasks and check order of dept_df's rows
+    if normalized is None:
+        normalized = normalize_frame(dept_df)
+    if config.memoize_combinations:
+        return validate_combinations(dept, dept_df, normalized)
+    return validate_frame(dept, dept_df, normalized)
+
+def apply_combination_lookups(lookups):
+    # Marks hits as recently used, adds new combinations and evicts the least
+    # recently used ones beyond combination_cache_size
+    hits, new_keys, new_codes = lookups
+    for key in hits:
+        if key in combination_cache:
+            combination_cache.move_to_end(key)
+    for key, code in zip(new_keys, new_codes):
+        combination_cache[key] = code
+    combination_cache_stats["hits"] += len(hits)
+    combination_cache_stats["misses"] += len(new_keys)
+    while len(combination_cache) > config.combination_cache_size:
+        combination_cache.popitem(last=False)
+        combination_cache_stats["evictions"] += 1
+
+def validate_department(dept, dept_df, input_columns, cached=None, normalized=None):
+    # Returns the department's output, exception and common usage frames and
+    # the exception rows' reason bitmasks; cached is (bitmasks, found) from the
+    # incremental state, where rows not found are validated, and normalized the
+    # normalization of dept_df's rows (computed here when not given)
+    if config.validation_engine == "row" and not config.memoize_combinations:
+        exceptions = []
+        codes = []
+        common_usage = []
+        for _, row in dept_df.iterrows():
+            reasons = validate_row(dept, row)
+            # The row engine only reports hits per rule; every row goes through validate_row
+            for reason in reasons:
+                rule_metrics.setdefault(reason, [len(dept_df), 0, None])[1] += 1
+            if reasons:
+                record = row.to_dict()
+                record['Exception Reasons'] = "; ".join(reasons)
+                exceptions.append(record)
+                codes.append(reason_code(reasons))
+            # Check for "Common" in specified columns
+            if (str(row.get("FC-Vertical.Name", "") or "").strip() == "Common" or
+                str(row.get("Department.Name", "") or "").strip() == "Common" or
+                str(row.get("Sub Department.Name", "") or "").strip() == "Common"):
+                common_usage.append(row.to_dict())
+
+        # Prepare exceptions with input columns + Exception Reasons
+        if exceptions:
+            exception_df = pd.DataFrame(exceptions)
+            exception_df = exception_df.reindex(columns=input_columns + ['Exception Reasons'], fill_value='')
+        else:
+            exception_df = pd.DataFrame(columns=input_columns + ['Exception Reasons'])
+
+        # Prepare common usage with input columns
+        if common_usage:
+            common_usage_df = pd.DataFrame(common_usage)
+            common_usage_df = common_usage_df.reindex(columns=input_columns, fill_value='')
+        else:
+            common_usage_df = pd.DataFrame(columns=input_columns)
+        exception_codes = np.array(codes, dtype=np.uint64)
+    else:
+        if cached is None:
+            codes, order = evaluate_rows(dept, dept_df, normalized)
+        else:
+            codes, found = cached
+            codes = codes.copy()
+            stale = ~found
+            stale_normalized = None if normalized is None else {column: values.take(stale) for column, values in normalized.items()}
+            codes[stale], order = evaluate_rows(dept, dept_df[stale], stale_normalized)
+        has_reasons = codes != 0
+        exception_codes = codes[has_reasons]
+        exception_df = dept_df[has_reasons].copy()
+        exception_df['Exception Reasons'] = render_reasons(exception_codes, order)
+        exception_df = exception_df.reindex(columns=input_columns + ['Exception Reasons'], fill_value='')
+        common_usage_df = dept_df[common_usage_mask(dept_df, normalized)].reindex(columns=input_columns, fill_value='')
+
+    # Prepare dept_df with input columns
+    dept_df = dept_df.reindex(columns=input_columns, fill_value='')
+    return dept_df, exception_df, common_usage_df, exception_codes
+
+def fingerprint_rows(df, input_columns):
+    # One 64-bit hash per row over every input column, 'Modified date' included
+    return pd.util.hash_pandas_object(df[input_columns], index=False).to_numpy()
+
+def changed_reference_rows(df, previous_refs):
+    # A row's result only depends on a reference list through the membership of
+    # its own values, so only rows holding a value that was added to or removed
+    # from a list can change; None means every row has to be validated again
+    touched = np.zeros(len(df), dtype=bool)
+    for key, (_, column) in config.reference_sources.items():
+        previous = previous_refs.get(key)
+        if previous is None:
+            return None
+        if previous == rules.ref_files[key] or column not in df.columns:
+            continue
+        changed = previous ^ rules.ref_files[key]
+        values = df[column]
+        touched |= is_in(values, changed) | is_in(map_distinct(values, clean_text, object), changed)
+    return touched
+
+def load_validation_state(state_file, df, fingerprints):
+    # Stored reason bitmasks and a mask of the rows they are valid for; rows
+    # that are new, modified or touched by a reference list change are not found
+    cached_codes = np.zeros(len(df), dtype=np.uint64)
+    found = np.zeros(len(df), dtype=bool)
+    try:
+        with open(state_file, "rb") as f:
+            state = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return cached_codes, found
+    if state.get("rules_version") != config.RULES_VERSION:
+        return cached_codes, found
+    touched = changed_reference_rows(df, state["references"])
+    if touched is None:
+        return cached_codes, found
+    stored = state["fingerprints"]
+    if len(stored) == 0:
+        return cached_codes, found
+    positions = np.minimum(np.searchsorted(stored, fingerprints), len(stored) - 1)
+    found = (stored[positions] == fingerprints) & ~touched
+    cached_codes[found] = state["codes"][positions[found]]
+    return cached_codes, found
+
+def save_validation_state(state_file, fingerprints, row_codes):
+    # Fingerprints are kept sorted for searchsorted lookups
+    fingerprints, first = np.unique(fingerprints, return_index=True)
+    state = {
+        "rules_version": config.RULES_VERSION,
+        "references": rules.ref_files,
+        "fingerprints": fingerprints,
+        "codes": row_codes[first],
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(state_file)), exist_ok=True)
+    tmp_file = state_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, state_file)
+
+def validate_department_partition(dept):
+    # Returns the department's frames, its timings and rule metrics and its
+    # combination cache lookups
+    global combination_lookups
+    sorted_df, partitions, input_columns, cached, normalized = department_context
+    rows = partitions[dept]
+    if cached is not None:
+        cached = (cached[0][rows], cached[1][rows])
+    if normalized is not None:
+        normalized = {column: values.take(rows) for column, values in normalized.items()}
+    rule_metrics.clear()
+    combination_lookups = ([], [], [])
+    start = time.perf_counter()
+    result = validate_department(dept, sorted_df.iloc[rows], input_columns, cached, normalized)
+    metrics = {
+        "department": str(dept),
+        "rows": rows.stop - rows.start,
+        "exceptions": len(result[1]),
+        "seconds": round(time.perf_counter() - start, 6),
+        "rules": [
+            {"rule": message, "evaluations": evaluations, "hits": hits,
+             "seconds": None if seconds is None else round(seconds, 6)}
+            for message, (evaluations, hits, seconds) in rule_metrics.items()
+        ],
+    }
+    if config.memoize_combinations:
+        metrics["combination_hits"] = len(combination_lookups[0])
+        metrics["combination_misses"] = len(combination_lookups[1])
+    return result, metrics, combination_lookups
+
+def validate_departments(df, input_columns, workers=1, state_file=None):
+    global department_context, combination_cache_references
+    if combination_cache_references is not rules.ref_files:
+        combination_cache.clear()
+        combination_cache_references = rules.ref_files
+    cached = None
+    if state_file is not None:
+        if config.validation_engine == "row" and not config.memoize_combinations:
+            # The plain row engine rebuilds its exception rows and cannot store
+            # results against the input rows; memoized it takes the state
+            pipeline_metrics["incremental"] = {"enabled": False}
+            print('Incremental validation is disabled: validation_engine = "row" needs memoize_combinations', file=sys.stderr)
+        else:
+            fingerprints = fingerprint_rows(df, input_columns)
+            cached = load_validation_state(state_file, df, fingerprints)
+            pipeline_metrics["incremental"] = {"enabled": True, "reused_rows": int(cached[1].sum())}
+
+    # One stable sort groups the rows by department in first-appearance order,
+    # so every department is a contiguous slice of sorted_df; forked workers
+    # inherit sorted_df and the slice bounds instead of receiving pickled rows
+    codes, depts = pd.factorize(df['Department.Name'])
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(depts) + 1)).tolist()
+    depts = list(depts)
+    partitions = {dept: slice(bounds[i], bounds[i + 1]) for i, dept in enumerate(depts)}
+    sorted_df = df.take(order)
+    if cached is not None:
+        cached = (cached[0][order], cached[1][order])
+    # Every checked column is normalized once for the whole file; departments
+    # and workers take their rows' codes
+    normalized = None
+    if config.validation_engine != "row" or config.memoize_combinations:
+        start = time.perf_counter()
+        normalized = normalize_frame(sorted_df)
+        pipeline_metrics["normalization"] = {
+            "seconds": round(time.perf_counter() - start, 6),
+            "distinct_values": {column: len(values.values) for column, values in normalized.items()},
+        }
+    department_context = (sorted_df, partitions, input_columns, cached, normalized)
+    pool = fork_pool(min(workers, len(depts)))
+    if pool is None:
+        results = map(validate_department_partition, depts)
+    else:
+        with pool:
+            # map keeps results in department order whatever order workers finish in
+            results = list(pool.map(validate_department_partition, depts))
+
+    # Collect data for all departments, exceptions, and common usage
+    dept_dfs = {}
+    exception_dfs_dict = {}
+    common_usage_dfs = {}
+    exception_codes = {}
+    pipeline_metrics["departments"] = []
+    for dept, ((dept_df, exception_df, common_usage_df, codes), metrics, lookups) in zip(depts, results):
+        pipeline_metrics["departments"].append(metrics)
+        apply_combination_lookups(lookups)
+        dept_dfs[dept] = dept_df
+        exception_dfs_dict[dept] = exception_df
+        common_usage_dfs[dept] = common_usage_df
+        exception_codes[dept] = codes
+
+    if config.memoize_combinations:
+        pipeline_metrics["combination_cache"] = dict(combination_cache_stats, size=len(combination_cache))
+
+    if cached is not None:
+        # Store every row's bitmask, 0 for rows without exceptions
+        row_codes = np.zeros(len(df), dtype=np.uint64)
+        for dept, exception_df in exception_dfs_dict.items():
+            row_codes[df.index.get_indexer(exception_df.index)] = exception_codes[dept]
+        save_validation_state(state_file, fingerprints, row_codes)
+    return dept_dfs, exception_dfs_dict, common_usage_dfs, exception_codes
@@ -0,0 +1,197 @@
+import os
+import time
+import sqlite3
+
+import pandas as pd
+import numpy as np
+
+from . import config
+from .rules import reason_messages, parse_reason_codes
+
+# Exception history: every run's exception rows are appended to a SQLite
+# store, keyed by run date, with one row per exception and reason. Each run
+# also stores the totals the summary sheets are built from, so a summary over
+# any range of run dates adds up stored totals instead of exception rows.
+# Reason ids are assigned per message, so they stay valid when the registry's
+# bits change
+history_schema = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    run_date TEXT NOT NULL,
+    input_file TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    exceptions INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (run_date, input_file)
+);
+CREATE TABLE IF NOT EXISTS reasons (
+    reason_id INTEGER PRIMARY KEY,
+    message TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS exceptions (
+    exception_id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    run_date TEXT NOT NULL,
+    department TEXT,
+    sub_department TEXT,
+    created_user TEXT,
+    modified_user TEXT,
+    net_amount REAL
+);
+CREATE INDEX IF NOT EXISTS exceptions_run_date ON exceptions (run_date);
+CREATE INDEX IF NOT EXISTS exceptions_run ON exceptions (run_id);
+CREATE INDEX IF NOT EXISTS exceptions_created_user ON exceptions (created_user, run_date);
+CREATE TABLE IF NOT EXISTS exception_reasons (
+    reason_id INTEGER NOT NULL REFERENCES reasons (reason_id),
+    run_date TEXT NOT NULL,
+    exception_id INTEGER NOT NULL REFERENCES exceptions (exception_id),
+    PRIMARY KEY (reason_id, run_date, exception_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS exception_reasons_exception ON exception_reasons (exception_id);
+CREATE TABLE IF NOT EXISTS user_totals (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    run_date TEXT NOT NULL,
+    department TEXT NOT NULL,
+    created_user TEXT NOT NULL,
+    modified_user TEXT NOT NULL,
+    exceptions INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS user_totals_run_date ON user_totals (run_date);
+CREATE INDEX IF NOT EXISTS user_totals_run ON user_totals (run_id);
+CREATE TABLE IF NOT EXISTS reason_totals (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    run_date TEXT NOT NULL,
+    department TEXT NOT NULL,
+    sub_department TEXT,
+    created_user TEXT,
+    reason_id INTEGER NOT NULL REFERENCES reasons (reason_id),
+    exceptions INTEGER NOT NULL,
+    amounts INTEGER NOT NULL,
+    net_amount REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reason_totals_run_date ON reason_totals (run_date);
+CREATE INDEX IF NOT EXISTS reason_totals_reason ON reason_totals (reason_id, run_date);
+CREATE INDEX IF NOT EXISTS reason_totals_run ON reason_totals (run_id);
+"""
+
+def connect_history(path=None):
+    # Opens (and creates) the history store; batch workers writing the same
+    # store wait for each other's transactions
+    connection = sqlite3.connect(path or config.history_file, timeout=60)
+    connection.executescript(history_schema)
+    return connection
+
+def history_reason_ids(connection):
+    # Registry bit -> reason id, adding the messages the store does not have yet
+    connection.executemany("INSERT OR IGNORE INTO reasons (message) VALUES (?)", [(message,) for message in reason_messages])
+    ids = dict(connection.execute("SELECT message, reason_id FROM reasons"))
+    return {bit: ids[message] for bit, message in enumerate(reason_messages)}
+
+def delete_run(connection, run_id):
+    connection.execute("DELETE FROM exception_reasons WHERE exception_id IN (SELECT exception_id FROM exceptions WHERE run_id = ?)", (run_id,))
+    for table in ("exceptions", "user_totals", "reason_totals", "runs"):
+        connection.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+
+def start_run(connection, input_file=None, run_date=None):
+    # Starts the run of input_file (default: data_file) dated run_date
+    # (default: history_run_date, or today); returns (run id, run date). A
+    # file recorded again for the same run date replaces its earlier run
+    input_file = os.path.abspath(input_file or config.data_file)
+    run_date = run_date or config.history_run_date or time.strftime("%Y-%m-%d")
+    for (run_id,) in connection.execute("SELECT run_id FROM runs WHERE run_date = ? AND input_file = ?", (run_date, input_file)).fetchall():
+        delete_run(connection, run_id)
+    cursor = connection.execute("INSERT INTO runs (run_date, input_file, recorded_at) VALUES (?, ?, ?)",
+                                (run_date, input_file, time.strftime("%Y-%m-%dT%H:%M:%S")))
+    return cursor.lastrowid, run_date
+
+def history_text(series):
+    # Blank cells are stored as NULL, as the summaries leave them out
+    return [None if pd.isna(value) or value == "" else str(value) for value in series.astype(object)]
+
+def add_exceptions(connection, run_id, run_date, exception_dfs, exception_codes=None):
+    # Appends exception frames keyed by department; exception_codes are their
+    # reason bitmasks, parsed from the reason strings when not given
+    reason_ids = history_reason_ids(connection)
+    for dept, df in exception_dfs.items():
+        if df.empty:
+            continue
+        codes = parse_reason_codes(df['Exception Reasons']) if exception_codes is None else exception_codes[dept]
+        first_id = connection.execute("SELECT COALESCE(MAX(exception_id), 0) + 1 FROM exceptions").fetchone()[0]
+        exception_ids = np.arange(first_id, first_id + len(df))
+        departments = history_text(df['Department.Name'] if 'Department.Name' in df.columns else pd.Series(dept, index=df.index))
+        amounts = pd.to_numeric(df['Net amount'], errors='coerce').astype(object).where(lambda values: values.notna(), None)
+        connection.executemany(
+            "INSERT INTO exceptions (exception_id, run_id, run_date, department, sub_department, created_user, modified_user, net_amount)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(exception_ids.tolist(), [run_id] * len(df), [run_date] * len(df), departments,
+                history_text(df['Sub Department.Name']), history_text(df['Created user']),
+                history_text(df['Modified user']), amounts.tolist()))
+        codes = np.asarray(codes, dtype=np.uint64)
+        for bit, reason_id in reason_ids.items():
+            flagged = exception_ids[(codes >> np.uint64(bit)) & np.uint64(1) != 0].tolist()
+            connection.executemany("INSERT INTO exception_reasons (reason_id, run_date, exception_id) VALUES (?, ?, ?)",
+                                   [(reason_id, run_date, exception_id) for exception_id in flagged])
+
+def finish_run(connection, run_id):
+    # Stores the run's summary totals and commits it
+    connection.execute("""
+        INSERT INTO user_totals (run_id, run_date, department, created_user, modified_user, exceptions)
+        SELECT run_id, run_date, department, created_user, modified_user, COUNT(*) FROM exceptions
+        WHERE run_id = ? AND department IS NOT NULL AND created_user IS NOT NULL AND modified_user IS NOT NULL
+        GROUP BY department, created_user, modified_user""", (run_id,))
+    connection.execute("""
+        INSERT INTO reason_totals (run_id, run_date, department, sub_department, created_user, reason_id, exceptions, amounts, net_amount)
+        SELECT e.run_id, e.run_date, e.department, e.sub_department, e.created_user, x.reason_id,
+               COUNT(*), COUNT(e.net_amount), TOTAL(e.net_amount)
+        FROM exceptions e JOIN exception_reasons x ON x.exception_id = e.exception_id
+        WHERE e.run_id = ? AND e.department IS NOT NULL
+        GROUP BY e.department, e.sub_department, e.created_user, x.reason_id""", (run_id,))
+    connection.execute("UPDATE runs SET exceptions = (SELECT COUNT(*) FROM exceptions WHERE run_id = ?) WHERE run_id = ?", (run_id, run_id))
+    connection.commit()
+
+def record_run(result, input_file=None, run_date=None, path=None):
+    # Appends a ValidationResult's exceptions to the history store (default:
+    # history_file) as a run of input_file dated run_date, see start_run
+    connection = connect_history(path)
+    try:
+        run_id, run_date = start_run(connection, input_file, run_date)
+        add_exceptions(connection, run_id, run_date, result.exceptions, result.exception_codes)
+        finish_run(connection, run_id)
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+def history_summary(connection, first, last):
+    # The summary sheets' frames (see reports.write_summary) over the runs
+    # dated first to last (YYYY-MM-DD, both included); None when those runs
+    # have no exceptions
+    dates = (first, last)
+    user_counts = pd.read_sql_query("""
+        SELECT created_user AS "Created user", modified_user AS "Modified user", department AS "Department.Name",
+               SUM(exceptions) AS "Count"
+        FROM user_totals WHERE run_date BETWEEN ? AND ?
+        GROUP BY created_user, modified_user, department""", connection, params=dates)
+    error_counts = pd.read_sql_query("""
+        SELECT t.department AS "Department.Name", r.message AS "Exception Reasons List", SUM(t.exceptions) AS "Count"
+        FROM reason_totals t JOIN reasons r ON r.reason_id = t.reason_id
+        WHERE t.run_date BETWEEN ? AND ? AND t.created_user IS NOT NULL
+        GROUP BY t.department, t.reason_id""", connection, params=dates)
+    detailed_summary = pd.read_sql_query("""
+        SELECT t.department AS "Department.Name", t.sub_department AS "Sub Department.Name",
+               t.created_user AS "Created user", r.message AS "Exception Reasons List",
+               SUM(t.amounts) AS "Count", SUM(t.net_amount) AS "Total Net Amount"
+        FROM reason_totals t JOIN reasons r ON r.reason_id = t.reason_id
+        WHERE t.run_date BETWEEN ? AND ? AND t.sub_department IS NOT NULL AND t.created_user IS NOT NULL
+        GROUP BY t.department, t.sub_department, t.created_user, t.reason_id""", connection, params=dates)
+    if user_counts.empty and error_counts.empty:
+        return None, None, None
+    return (user_counts.set_index(['Created user', 'Modified user', 'Department.Name']),
+            error_counts.set_index(['Department.Name', 'Exception Reasons List']).sort_index(),
+            detailed_summary.set_index(['Department.Name', 'Sub Department.Name', 'Created user', 'Exception Reasons List']).sort_index())
+
+def history_runs(connection, first, last):
+    # (runs, exceptions) dated first to last
+    return connection.execute("SELECT COUNT(*), COALESCE(SUM(exceptions), 0) FROM runs WHERE run_date BETWEEN ? AND ?",
+                              (first, last)).fetchone()
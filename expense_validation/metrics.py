@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import time
+import resource
+import contextlib
+
+# Measurements of the current run, written to metrics_file
+pipeline_metrics = {"stages": [], "departments": []}
+
+# This process's high-water mark from before the last reset_peak_memory,
+# which also restarts the one getrusage reports
+memory_high_water = 0
+
+def max_rss():
+    # Largest resident set size in bytes this process or any of its finished
+    # workers reached so far in the run; it never goes down
+    scale = 1 if sys.platform == "darwin" else 1024
+    return max(memory_high_water, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+def stage_peak_memory():
+    # Peak resident set size in bytes of this process since reset_peak_memory
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return None
+
+def reset_peak_memory():
+    # Restarts this process's peak resident set size from its current size;
+    # False where the kernel cannot (anything but Linux)
+    global memory_high_water
+    try:
+        memory_high_water = max(memory_high_water, stage_peak_memory() or 0)
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+@contextlib.contextmanager
+def pipeline_stage(name, rows):
+    # Yields the stage's record so rows can be filled in once they are known.
+    # peak_memory_bytes is the peak resident set size of this process during
+    # the stage (None where it cannot be measured); forked pool workers are
+    # only counted in max_rss_bytes, the run's high-water mark so far
+    stage = {"stage": name, "rows": rows}
+    pipeline_metrics["stages"].append(stage)
+    measured = reset_peak_memory()
+    start = time.perf_counter()
+    yield stage
+    seconds = time.perf_counter() - start
+    stage["seconds"] = round(seconds, 6)
+    stage["rows_per_second"] = round(stage["rows"] / seconds, 1) if seconds > 0 else None
+    stage["peak_memory_bytes"] = stage_peak_memory() if measured else None
+    stage["max_rss_bytes"] = max_rss()
+
+def write_metrics(path):
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(pipeline_metrics, f, indent=2)
+    os.replace(tmp_file, path)
@@ -0,0 +1,109 @@
+import time
+import collections
+import multiprocessing
+from multiprocessing.connection import wait as wait_connections
+from concurrent.futures import ProcessPoolExecutor
+
+from .metrics import pipeline_metrics, pipeline_stage, max_rss, reset_peak_memory, stage_peak_memory
+
+def fork_pool(workers, **kwargs):
+    # Workers are forked so they inherit the loaded state instead of re-running this script
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"), **kwargs)
+
+def run_job(sender, func, args):
+    # Runs in the job's process and sends back None or the error message, and
+    # the job's peak memory
+    measured = reset_peak_memory()
+    try:
+        func(*args)
+        error = None
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    sender.send((error, stage_peak_memory() if measured else None))
+
+class JobScheduler:
+    # Runs jobs on up to `workers` processes, each forked when its job starts
+    # so it inherits the frames it works on instead of having them pickled to
+    # it. Further jobs wait in submission order and fork once a process is
+    # free, so only `workers` jobs hold memory of their own at a time. Every
+    # job is recorded as a pipeline stage timed from its start to its end. With
+    # one worker (or without fork) a job runs as it is submitted. Leaving the
+    # with block waits for every job and raises their failures as a ValueError
+    def __init__(self, workers):
+        self.workers = workers
+        self.context = None
+        if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+            self.context = multiprocessing.get_context("fork")
+        self.queued = collections.deque()
+        # Result pipe -> (process, stage, start time) of every running job
+        self.running = {}
+        self.errors = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.wait()
+            return
+        # The caller failed; its jobs are abandoned
+        self.queued.clear()
+        for receiver, (process, _, _) in self.running.items():
+            process.terminate()
+            process.join()
+            receiver.close()
+        self.running.clear()
+
+    def submit(self, name, rows, func, *args):
+        if self.context is None:
+            with pipeline_stage(name, rows):
+                func(*args)
+            return
+        stage = {"stage": name, "rows": rows, "concurrent": True}
+        pipeline_metrics["stages"].append(stage)
+        self.queued.append((stage, func, args))
+        self.poll(0)
+
+    def poll(self, timeout):
+        # Starts queued jobs on the free processes and collects the jobs that
+        # finish within timeout seconds (None: waits for the next one)
+        self.start_queued()
+        if self.running:
+            for receiver in wait_connections(list(self.running), timeout):
+                self.finish(receiver)
+        self.start_queued()
+
+    def start_queued(self):
+        while self.queued and len(self.running) < self.workers:
+            stage, func, args = self.queued.popleft()
+            receiver, sender = self.context.Pipe(duplex=False)
+            process = self.context.Process(target=run_job, args=(sender, func, args))
+            process.start()
+            sender.close()
+            self.running[receiver] = (process, stage, time.perf_counter())
+
+    def finish(self, receiver):
+        process, stage, start = self.running.pop(receiver)
+        try:
+            error, peak = receiver.recv()
+        except EOFError:
+            error, peak = None, None
+        receiver.close()
+        process.join()
+        if error is None and process.exitcode != 0:
+            error = f"process exited with code {process.exitcode}"
+        seconds = time.perf_counter() - start
+        stage["seconds"] = round(seconds, 6)
+        stage["rows_per_second"] = round(stage["rows"] / seconds, 1) if seconds > 0 else None
+        stage["peak_memory_bytes"] = peak
+        stage["max_rss_bytes"] = max_rss()
+        if error is not None:
+            self.errors.append(f"{stage['stage']} failed: {error}")
+
+    def wait(self):
+        while self.queued or self.running:
+            self.poll(None)
+        if self.errors:
+            raise ValueError("; ".join(self.errors))
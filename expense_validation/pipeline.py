@@ -0,0 +1,146 @@
+import os
+import time
+import collections
+
+from . import config
+from .metrics import pipeline_metrics, pipeline_stage, write_metrics
+
+# Pipeline API. Every stage imports the modules it needs when it runs, so
+# importing the package stays cheap and a stage never loads what it does not
+# use (validating a frame already in memory against cached references does
+# not import openpyxl)
+
+# Frames of one run keyed by department in first-appearance order, and each
+# department's exception reason bitmasks. departments, common_usage and
+# exception_codes are None for exceptions read back from an existing report
+ValidationResult = collections.namedtuple(
+    "ValidationResult", ["input_columns", "departments", "exceptions", "common_usage", "exception_codes"])
+
+def load_references(input_path=None, cache_file=None):
+    # Loads the reference lists the checks use, by default from the configured
+    # input_path; the parsed lists are cached in cache_file
+    from . import rules
+    from .references import load_reference_data
+    rules.ref_files = load_reference_data(input_path or config.input_path, cache_file or config.reference_cache_file)
+    return rules.ref_files
+
+def validate(data=None, workers=None, state_file=None):
+    # data is an input workbook path (default: data_file) or a frame returned
+    # by reader.read_input. References are loaded first unless they already
+    # are; a state_file makes the run incremental against that state
+    from . import rules
+    from .engine import validate_departments
+    if data is None or isinstance(data, (str, os.PathLike)):
+        from .reader import read_input
+        with pipeline_stage("read_input", 0) as stage:
+            df = read_input(data or config.data_file)
+            stage["rows"] = len(df)
+    else:
+        df = data
+    input_columns = df.columns.tolist()
+    if not rules.ref_files:
+        with pipeline_stage("load_references", len(df)):
+            load_references()
+    if workers is None:
+        workers = config.validation_workers
+    with pipeline_stage("validate", len(df)):
+        dept_dfs, exception_dfs, common_usage_dfs, exception_codes = validate_departments(df, input_columns, workers, state_file)
+    return ValidationResult(input_columns, dept_dfs, exception_dfs, common_usage_dfs, exception_codes)
+
+def load_exception_report(path=None):
+    # ValidationResult of an Exception_Report.xlsx written by an earlier run,
+    # from which the summary and correction entries can be rebuilt. The
+    # correction suggestions need the references, loaded unless they already are
+    import pandas as pd
+    from . import rules
+    from .reports import read_exception_report
+    with pipeline_stage("read_exception_report", 0) as stage:
+        exception_dfs = read_exception_report(path or config.exception_file)
+        stage["rows"] = sum(map(len, exception_dfs.values()))
+    if config.correction_suggestions and not rules.ref_files:
+        with pipeline_stage("load_references", stage["rows"]):
+            load_references()
+    report_columns = next(iter(exception_dfs.values()), pd.DataFrame()).columns
+    input_columns = [col for col in report_columns if col != 'Exception Reasons']
+    return ValidationResult(input_columns, None, exception_dfs, None, None)
+
+def write_reports(result, output_format=None, scheduler=None):
+    # Writes a ValidationResult to the configured report paths: the styled
+    # workbooks, or for a columnar output_format the datasets under
+    # columnar_output_dir. The summary report is always a workbook. The files
+    # are written on the jobs of scheduler (default: one on report_workers
+    # that is waited for), while the correction entries are built here
+    from .parallel import JobScheduler
+    from .reports import write_report, write_summary_report, build_correction_entries
+    output_format = output_format or config.output_format
+    if scheduler is None:
+        with JobScheduler(config.report_workers) as scheduler:
+            write_reports(result, output_format, scheduler)
+        return
+    if result.departments is not None and output_format == "excel":
+        # Write All_Departments_Output.xlsx
+        scheduler.submit("write_all_departments", sum(map(len, result.departments.values())), write_report,
+                         config.all_depts_file, [(str(dept), dept_df) for dept, dept_df in result.departments.items()])
+
+        # Write Exception_Report.xlsx
+        scheduler.submit("write_exception_report", sum(map(len, result.exceptions.values())), write_report,
+                         config.exception_file, [(str(dept), exception_df) for dept, exception_df in result.exceptions.items()])
+
+        # Write Common_Usage_Report.xlsx
+        scheduler.submit("write_common_usage", sum(map(len, result.common_usage.values())), write_report,
+                         config.common_usage_file, [(str(dept), common_usage_df) for dept, common_usage_df in result.common_usage.items()])
+
+    # The summary and correction entries are built from the in-memory
+    # exception frames; the report is only read back in summarize mode
+    exception_rows = sum(map(len, result.exceptions.values()))
+    scheduler.submit("write_summary_report", exception_rows, write_summary_report,
+                     result.exceptions, config.summary_file, result.exception_codes)
+    with pipeline_stage("build_correction_entries", exception_rows):
+        correction_entries = build_correction_entries(result.exceptions, result.input_columns)
+    if output_format == "excel" or result.departments is None:
+        scheduler.submit("write_correction_entries", exception_rows, write_report,
+                         config.correction_file, [('Correction Entries', correction_entries)])
+    else:
+        from .columnar import write_columnar_output, split_by_department
+        datasets = {
+            "all_departments": result.departments,
+            "exceptions": result.exceptions,
+            "common_usage": result.common_usage,
+            "correction_entries": split_by_department(correction_entries),
+        }
+        scheduler.submit("write_columnar_output", sum(map(len, result.departments.values())) + exception_rows,
+                         write_columnar_output, config.columnar_output_dir, datasets, result.input_columns, output_format)
+
+def run_pipeline():
+    # Runs the configured stages on data_file, writing the reports to the
+    # configured paths; references already loaded are reused
+    pipeline_metrics["stages"] = []
+    pipeline_metrics["started"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    start = time.perf_counter()
+    if config.excel_from_columnar_output:
+        from .columnar import write_excel_from_columnar
+        with pipeline_stage("write_excel_from_columnar", 0) as stage:
+            stage["rows"] = write_excel_from_columnar(config.columnar_output_dir)
+    elif config.streaming_validation:
+        # Streaming records the history as it goes
+        from .streaming import stream_reports
+        stream_reports(config.data_file, config.validation_workers)
+    else:
+        if config.summarize_existing_report:
+            result = load_exception_report(config.exception_file)
+        else:
+            state_file = config.validation_state_file if config.incremental_validation else None
+            result = validate(config.data_file, config.validation_workers, state_file)
+        # The history is recorded while the reports are written
+        from .parallel import JobScheduler
+        with JobScheduler(config.report_workers) as scheduler:
+            write_reports(result, scheduler=scheduler)
+            if config.history_file is not None:
+                from .history import record_run
+                with pipeline_stage("record_history", sum(map(len, result.exceptions.values()))):
+                    record_run(result)
+
+    # Stages written concurrently overlap, so the total is the elapsed time
+    pipeline_metrics["total_seconds"] = round(time.perf_counter() - start, 6)
+    if config.metrics_file is not None:
+        write_metrics(config.metrics_file)
@@ -0,0 +1,151 @@
+import os
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+
+from . import config
+
+# Header and reference checks that only use the standard library, so a
+# preflight never pays for importing pandas or openpyxl
+SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+PACKAGE_RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+REL_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+RELATIONSHIP_TAG = '{%s}Relationship' % PACKAGE_RELS_NS
+SHEET_TAG = '{%s}sheet' % SHEET_MAIN_NS
+ROW_TAG = '{%s}row' % SHEET_MAIN_NS
+CELL_TAG = '{%s}c' % SHEET_MAIN_NS
+VALUE_TAG = '{%s}v' % SHEET_MAIN_NS
+TEXT_TAG = '{%s}t' % SHEET_MAIN_NS
+RUN_TAG = '{%s}r' % SHEET_MAIN_NS
+INLINE_STRING_TAG = '{%s}is' % SHEET_MAIN_NS
+SHARED_STRING_TAG = '{%s}si' % SHEET_MAIN_NS
+
+def read_relationships(archive, part):
+    # Relationship id -> (type, archive path of the target) of a package part;
+    # part "" reads the package relationships
+    rels_path = posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+    try:
+        root = ET.fromstring(archive.read(rels_path))
+    except KeyError:
+        return {}
+    relationships = {}
+    for rel in root.iter(RELATIONSHIP_TAG):
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+        relationships[rel.get("Id")] = (rel.get("Type", ""), target)
+    return relationships
+
+def string_text(node):
+    # Plain text of a shared or inline string, phonetic runs left out
+    text = "".join([node.findtext(TEXT_TAG) or ""] + [run.findtext(TEXT_TAG) or "" for run in node.findall(RUN_TAG)])
+    return text.replace('x005F_', '')
+
+def column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+def header_value(cell, strings):
+    data_type = cell.get('t', 'n')
+    if data_type == 'inlineStr':
+        child = cell.find(INLINE_STRING_TAG)
+        return "" if child is None else string_text(child)
+    value = cell.findtext(VALUE_TAG)
+    if not value:
+        return ""
+    if data_type == 's':
+        return strings[int(value)]
+    if data_type == 'n':
+        number = float(value)
+        return int(number) if number.is_integer() else number
+    return value
+
+def read_input_header(path):
+    # First row of the first worksheet (the sheet pd.read_excel uses), decoding
+    # only the shared strings that row refers to
+    with zipfile.ZipFile(path) as archive:
+        package = read_relationships(archive, "")
+        workbook = next((target for rel_type, target in package.values() if rel_type.endswith("/officeDocument")), None)
+        if workbook is None:
+            raise ValueError(f"{path} has no workbook part")
+        rels = read_relationships(archive, workbook)
+        names = set(archive.namelist())
+        sheet_path = None
+        for sheet in ET.fromstring(archive.read(workbook)).iter(SHEET_TAG):
+            rel_type, target = rels.get(sheet.get(REL_ID), ("", ""))
+            if rel_type.endswith("/worksheet") and target in names:
+                sheet_path = target
+                break
+        if sheet_path is None:
+            raise ValueError(f"No worksheet found in {path}")
+
+        with archive.open(sheet_path) as src:
+            row = next((element for _, element in ET.iterparse(src) if element.tag == ROW_TAG), None)
+        if row is None:
+            return []
+        cells = row.findall(CELL_TAG)
+        indices = {int(cell.findtext(VALUE_TAG)) for cell in cells if cell.get('t') == 's' and cell.findtext(VALUE_TAG)}
+        strings = {}
+        shared_strings = next((target for rel_type, target in rels.values() if rel_type.endswith("/sharedStrings")), None)
+        if indices and shared_strings in names:
+            with archive.open(shared_strings) as src:
+                index = 0
+                for _, node in ET.iterparse(src):
+                    if node.tag != SHARED_STRING_TAG:
+                        continue
+                    if index in indices:
+                        strings[index] = string_text(node)
+                    node.clear()
+                    index += 1
+                    if index > max(indices):
+                        break
+
+    values = []
+    for cell in cells:
+        coordinate = cell.get('r')
+        column = column_number(coordinate.rstrip("0123456789")) if coordinate else len(values) + 1
+        values.extend([""] * (column - 1 - len(values)))
+        values.append(header_value(cell, strings))
+    return values
+
+def check_input_header(path):
+    # Verify required columns from the header before reading the data
+    header_columns = [str(column).strip() for column in read_input_header(path)]
+    for column in config.required_columns:
+        if column not in header_columns:
+            raise ValueError(f"Column '{column}' not found in the input file. Available columns: {header_columns}")
+    return header_columns
+
+def input_problems(path):
+    # A missing or unreadable input workbook, or missing required columns
+    try:
+        check_input_header(path)
+    except (OSError, KeyError, zipfile.BadZipFile, ET.ParseError, ValueError) as e:
+        return [f"{path}: {str(e)}"]
+    return []
+
+def reference_problems(input_path):
+    # Reference workbooks that are missing or lack the column that is read
+    problems = []
+    for key, (file_name, column) in config.reference_sources.items():
+        path = os.path.join(input_path, file_name)
+        if not os.path.isfile(path):
+            problems.append(f"Reference file {path} not found")
+            continue
+        try:
+            header_columns = [str(value) for value in read_input_header(path)]
+        except (OSError, KeyError, zipfile.BadZipFile, ET.ParseError, ValueError) as e:
+            problems.append(f"{path}: {str(e)}")
+            continue
+        if column not in header_columns:
+            problems.append(f"Column '{column}' not found in reference file {path}")
+    return problems
+
+def preflight(data_file=None, input_path=None):
+    # Everything that would stop a run on data_file before validation starts;
+    # an empty list means the file and the references can be read
+    return input_problems(data_file or config.data_file) + reference_problems(input_path or config.input_path)
@@ -0,0 +1,274 @@
+import pandas as pd
+import numpy as np
+import re
+import functools
+import collections
+import xml.etree.ElementTree as ET
+from pandas.io.parsers import TextParser
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.styles.stylesheet import apply_stylesheet
+from openpyxl.utils.cell import column_index_from_string
+from openpyxl.utils.datetime import CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+from openpyxl.worksheet._reader import _cast_number
+from openpyxl.xml.constants import SHEET_MAIN_NS
+
+from . import config
+from .parallel import fork_pool
+from .preflight import check_input_header
+
+ROW_TAG = '{%s}row' % SHEET_MAIN_NS
+VALUE_TAG = '{%s}v' % SHEET_MAIN_NS
+TEXT_TAG = '{%s}t' % SHEET_MAIN_NS
+RUN_TAG = '{%s}r' % SHEET_MAIN_NS
+INLINE_STRING_TAG = '{%s}is' % SHEET_MAIN_NS
+worksheet_tag_pattern = re.compile(rb"<(?:\w+:)?worksheet\b[^>]*>")
+sheet_data_pattern = re.compile(rb"<((?:\w+:)?)sheetData\b[^>]*?(/?)>")
+
+def open_input_workbook(path):
+    # Reads only the package manifest and workbook part; returns the reader and
+    # the archive path of the first worksheet (the sheet pd.read_excel uses)
+    reader = ExcelReader(path, read_only=True, data_only=True, keep_links=False)
+    reader.read_manifest()
+    reader.read_workbook()
+    for _, rel in reader.parser.find_sheets():
+        if rel.target in reader.valid_files and "chartsheet" not in rel.Type:
+            return reader, rel.target
+    reader.archive.close()
+    raise ValueError(f"No worksheet found in {path}")
+
+def read_cell(cell, shared_strings, epoch=CALENDAR_WINDOWS_1900, date_formats=(), timedelta_formats=()):
+    # Decodes a <c> element the way openpyxl's read-only reader does (data_only)
+    # and converts the value the way pd.read_excel does
+    data_type = cell.get('t', 'n')
+    if data_type == 'inlineStr':
+        child = cell.find(INLINE_STRING_TAG)
+        if child is None:
+            return ""
+        return "".join([child.findtext(TEXT_TAG) or ""] + [run.findtext(TEXT_TAG) or "" for run in child.iter(RUN_TAG)])
+    value = cell.findtext(VALUE_TAG)
+    if not value:
+        return ""
+    if data_type == 'n':
+        value = _cast_number(value)
+        style_id = int(cell.get('s', 0))
+        if style_id in date_formats:
+            try:
+                return from_excel(value, epoch, timedelta=style_id in timedelta_formats)
+            except (OverflowError, ValueError):
+                return np.nan
+        val = int(value)
+        if val == value:
+            return val
+        return float(value)
+    if data_type == 's':
+        return shared_strings[int(value)]
+    if data_type == 'b':
+        return bool(int(value))
+    if data_type == 'd':
+        return from_ISO8601(value)
+    if data_type == 'e':
+        return np.nan
+    return value
+
+@functools.lru_cache(maxsize=None)
+def column_index(letters):
+    return column_index_from_string(letters)
+
+def read_row(row, shared_strings, *styles):
+    values = []
+    column = 0
+    for cell in row:
+        coordinate = cell.get('r')
+        column = column_index(coordinate.rstrip("0123456789")) if coordinate else column + 1
+        values.extend([""] * (column - 1 - len(values)))
+        values.append(read_cell(cell, shared_strings, *styles))
+    return values
+
+
+def init_sheet_parser(*context):
+    global sheet_parser_context
+    sheet_parser_context = context
+
+def parse_sheet_chunk(chunk):
+    # Parses a run of complete <row> elements into typed, pandas-converted rows
+    open_tag, prefix, shared_strings, *styles = sheet_parser_context
+    root = ET.fromstring(open_tag + b"<" + prefix + b"sheetData>" + chunk + b"</" + prefix + b"sheetData></" + prefix + b"worksheet>")
+    rows = []
+    row_number = 0
+    for row in root.iter(ROW_TAG):
+        row_number = int(row.get('r', row_number + 1))
+        rows.append((row_number, read_row(row, shared_strings, *styles)))
+    return rows
+
+def last_row_start(buffer, row_tag):
+    pos = buffer.rfind(row_tag)
+    while pos > 0:
+        next_char = buffer[pos + len(row_tag):pos + len(row_tag) + 1]
+        if next_char and next_char in b" \t\r\n>/":
+            return pos
+        pos = buffer.rfind(row_tag, 0, pos)
+    return -1
+
+def iter_row_chunks(src, buffer, prefix, chunk_bytes):
+    # Yields the sheetData body in pieces that always end on a row boundary
+    end_tag = b"</" + prefix + b"sheetData>"
+    row_tag = b"<" + prefix + b"row"
+    while True:
+        end = buffer.find(end_tag)
+        if end != -1:
+            if buffer[:end].strip():
+                yield buffer[:end]
+            return
+        data = src.read(chunk_bytes)
+        if not data:
+            raise ValueError("Worksheet XML ended before </sheetData>")
+        buffer += data
+        cut = last_row_start(buffer, row_tag)
+        if cut > 0:
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+
+def parse_chunks(chunks, context, workers):
+    pool = fork_pool(workers, initializer=init_sheet_parser, initargs=context)
+    if pool is None:
+        init_sheet_parser(*context)
+        for chunk in chunks:
+            yield parse_sheet_chunk(chunk)
+        return
+    with pool:
+        # Keep a bounded number of chunks in flight so memory stays flat
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.submit(parse_sheet_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def iter_input_rows(path, workers=1, chunk_bytes=None):
+    # Yields the first worksheet's rows as lists of values, header included;
+    # missing rows are yielded as empty rows, as openpyxl reads them. The sheet
+    # XML is read in chunk_bytes pieces (default: input_chunk_bytes)
+    if chunk_bytes is None:
+        chunk_bytes = config.input_chunk_bytes
+    reader, sheet_path = open_input_workbook(path)
+    try:
+        # Shared strings and date styles are decoded once and handed to every worker
+        reader.read_strings()
+        apply_stylesheet(reader.archive, reader.wb)
+        with reader.archive.open(sheet_path) as src:
+            buffer = b""
+            match = None
+            while match is None:
+                data_block = src.read(chunk_bytes)
+                if not data_block:
+                    raise ValueError(f"No sheetData found in {path}")
+                buffer += data_block
+                match = sheet_data_pattern.search(buffer)
+            prefix = match.group(1)
+            if match.group(2):
+                return
+            context = (worksheet_tag_pattern.search(buffer).group(0), prefix, reader.shared_strings,
+                       reader.wb.epoch, reader.wb._date_formats, reader.wb._timedelta_formats)
+            chunks = iter_row_chunks(src, buffer[match.end():], prefix, chunk_bytes)
+            count = 0
+            for rows in parse_chunks(chunks, context, workers):
+                for row_number, values in rows:
+                    for _ in range(row_number - 1 - count):
+                        yield []
+                    count = max(count, row_number - 1) + 1
+                    yield values
+    finally:
+        reader.archive.close()
+
+def trim_row(values):
+    while values and values[-1] == "":
+        values.pop()
+    return values
+
+def rows_frame(header, rows, width):
+    # Pads the rows to width columns and converts them the way pd.read_excel
+    # does after reading the cells
+    for values in rows:
+        values.extend([""] * (width - len(values)))
+    return TextParser([header + [""] * (width - len(header))] + rows, header=0, skip_blank_lines=False).read()
+
+def read_input_file(path, workers=1, chunk_bytes=None):
+    # Trim and pad rows the way pd.read_excel does before type inference
+    data = [trim_row(values) for values in iter_input_rows(path, workers, chunk_bytes)]
+    while data and not data[-1]:
+        data.pop()
+    if not data:
+        return pd.DataFrame()
+    return rows_frame(data[0], data[1:], max(len(values) for values in data))
+
+def read_input_chunks(path, chunk_rows, workers=1, chunk_bytes=None):
+    # Yields the input as prepared frames of chunk_rows() rows, which is asked
+    # again before every chunk so the caller can size chunks from the ones it
+    # has seen. Each chunk infers its column types from its own rows, and cells
+    # right of the header's last column are not read. Blank rows at the end of
+    # the sheet are dropped, as pd.read_excel drops them
+    check_input_header(path)
+    try:
+        rows = iter_input_rows(path, workers, chunk_bytes)
+        header = trim_row(next(rows, []))
+        chunk = []
+        blank = []
+        start = 0
+        for values in rows:
+            values = trim_row(values[:len(header)])
+            if not values:
+                blank.append(values)
+                continue
+            chunk += blank
+            blank = []
+            chunk.append(values)
+            if len(chunk) >= chunk_rows():
+                df = rows_frame(header, chunk, len(header))
+                df.index += start
+                start += len(df)
+                chunk = []
+                yield prepare_input(df)
+        if chunk:
+            df = rows_frame(header, chunk, len(header))
+            df.index += start
+            yield prepare_input(df)
+    except Exception as e:
+        raise ValueError(f"Failed to read input file {path}: {str(e)}")
+
+null_like_values = [pd.NA, "N/A", "NaN", "null", "NONE", "NA", "0", "-", "", " ", "\u00A0"]
+
+def read_input(path):
+    # A file read before is loaded from its snapshot when input_snapshot_dir is set
+    digest = None
+    if config.input_snapshot_dir is not None:
+        from .snapshots import input_digest, load_snapshot, save_snapshot
+        digest = input_digest(path)
+        df = load_snapshot(digest)
+        if df is not None:
+            return df
+
+    check_input_header(path)
+
+    # Read input file and extract columns
+    try:
+        if config.input_reader == "pandas":
+            df = pd.read_excel(path)
+        else:
+            df = read_input_file(path, config.input_read_workers)
+    except Exception as e:
+        raise ValueError(f"Failed to read input file {path}: {str(e)}")
+    df = prepare_input(df)
+    if digest is not None:
+        save_snapshot(digest, df)
+    return df
+
+def prepare_input(df):
+    df.columns = df.columns.str.strip()
+
+    # Preprocess Sub Department to handle empty-like values
+    df['Sub Department.Name'] = df['Sub Department.Name'].replace(null_like_values, "").str.strip()
+    for column in config.categorical_columns:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    return df
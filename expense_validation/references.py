@@ -0,0 +1,45 @@
+import pandas as pd
+import os
+import pickle
+
+from . import config
+
+# Account codes are compared as strings
+account_code_references = {"Region_Excluded_Accounts", "Zone_Excluded_Accounts"}
+
+def read_reference_list(key, path, column):
+    values = pd.read_excel(path)[column].dropna()
+    if key in account_code_references:
+        values = values.astype(str)
+    return frozenset(values.unique())
+
+def reference_signatures(input_path):
+    # (path, column, size, mtime) of every reference source file
+    signatures = {}
+    for key, (file_name, column) in config.reference_sources.items():
+        path = os.path.join(input_path, file_name)
+        stat = os.stat(path)
+        signatures[key] = (path, column, stat.st_size, stat.st_mtime_ns)
+    return signatures
+
+def load_reference_data(input_path, cache_file):
+    # Parsed lists are cached on disk, keyed by each source file's path, size
+    # and mtime; only entries whose source file changed are parsed again
+    try:
+        with open(cache_file, "rb") as f:
+            cache = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        cache = {}
+    entries = {}
+    for key, signature in reference_signatures(input_path).items():
+        entry = cache.get(key)
+        if entry is None or entry[0] != signature:
+            entry = (signature, read_reference_list(key, signature[0], signature[1]))
+        entries[key] = entry
+    if entries != cache:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        tmp_file = cache_file + ".tmp"
+        with open(tmp_file, "wb") as f:
+            pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    return {key: values for key, (_, values) in entries.items()}
@@ -0,0 +1,394 @@
+import pandas as pd
+import numpy as np
+import os
+import re
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import Cell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+
+from . import config
+from .rules import code_messages, parse_reason_codes
+
+header_style = {
+    'font': Font(bold=True),
+    'alignment': Alignment(horizontal='left', vertical='center'),
+    'fill': PatternFill(start_color='D3D3D3', end_color='D3D3D3', fill_type='solid'),
+    'border': Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+}
+cell_style = {
+    'alignment': Alignment(horizontal='left', vertical='center'),
+    'border': Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+}
+
+def apply_formatting(ws, headers, data_columns):
+    # Apply header formatting
+    for col_idx, header in enumerate(headers, start=1):
+        cell = ws.cell(row=1, column=col_idx)
+        cell.value = header
+        for attr, style in header_style.items():
+            setattr(cell, attr, style)
+
+    # Apply cell formatting
+    for row_idx in range(2, ws.max_row + 1):
+        for col_idx in range(1, len(headers) + 1):
+            cell = ws.cell(row=row_idx, column=col_idx)
+            for attr, style in cell_style.items():
+                setattr(cell, attr, style)
+            # Apply number formats based on column
+            col_name = headers[col_idx - 1]
+            if col_name == "Net amount":
+                cell.number_format = '#,##0.00'
+            elif col_name in ["Date", "Created date", "Modified date"]:
+                cell.number_format = 'DD/MM/YYYY'
+
+    # Auto-adjust column widths
+    for col_idx, column in enumerate(ws.columns, start=1):
+        max_length = 0
+        column_letter = get_column_letter(col_idx)
+        for cell in column:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+            except:
+                pass
+        adjusted_width = max_length + 2
+        ws.column_dimensions[column_letter].width = adjusted_width
+
+# Named styles shared by every cell of a column in the streamed reports
+def report_named_styles():
+    return [
+        NamedStyle(name="Report Header", **header_style),
+        NamedStyle(name="Report Cell", **cell_style),
+        NamedStyle(name="Report Amount", number_format='#,##0.00', **cell_style),
+        NamedStyle(name="Report Date", number_format='DD/MM/YYYY', **cell_style),
+        NamedStyle(name="Report Datetime", number_format='YYYY-MM-DD HH:MM:SS', **cell_style),
+    ]
+
+def column_style_name(name, is_datetime):
+    if name == "Net amount":
+        return "Report Amount"
+    if name in ["Date", "Created date", "Modified date"]:
+        return "Report Date"
+    if is_datetime:
+        return "Report Datetime"
+    return "Report Cell"
+
+def column_width(name, series):
+    # Longest header or rendered value + 2, as apply_formatting measures it
+    # (blank cells are written empty and count as zero)
+    max_length = len(str(name))
+    values = series.dropna()
+    if len(values):
+        if pd.api.types.is_datetime64_any_dtype(values):
+            max_length = max(max_length, 26 if (values.dt.microsecond != 0).any() else 19)
+        else:
+            max_length = max(max_length, int(values.astype(str).str.len().max()))
+    return max_length + 2
+
+# Characters Excel does not allow in sheet names
+invalid_sheet_chars = re.compile(r"[\[\]:*?/\\]")
+index_sheet = "Index"
+
+def sheet_title(name, used):
+    # Excel sheet names are at most 31 characters and unique regardless of
+    # case; a name already taken in the workbook gets a " (n)" suffix
+    base = invalid_sheet_chars.sub("_", str(name)).strip("'") or "Sheet"
+    title = base[:31]
+    count = 1
+    while title.lower() in used:
+        count += 1
+        suffix = f" ({count})"
+        title = base[:31 - len(suffix)] + suffix
+    used.add(title.lower())
+    return title
+
+def report_layout(sheets):
+    # Splits (name, frame) pairs into sheets of at most report_sheet_rows rows
+    # and workbooks of at most report_file_cells cells. Returns one list per
+    # workbook of (sheet title, name, frame, first row, stop row)
+    files = [[]]
+    used = {index_sheet.lower()}
+    cells = 0
+    for name, frame in sheets:
+        for start in range(0, max(len(frame), 1), config.report_sheet_rows):
+            stop = min(start + config.report_sheet_rows, len(frame))
+            shard_cells = (stop - start + 1) * len(frame.columns)
+            if files[-1] and cells + shard_cells > config.report_file_cells:
+                files.append([])
+                used = {index_sheet.lower()}
+                cells = 0
+            files[-1].append((sheet_title(name, used), name, frame, start, stop))
+            cells += shard_cells
+    return files
+
+def report_file_path(path, number):
+    # Path of a report's numbered workbook: Report.xlsx, Report_2.xlsx, ...
+    if number == 1:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_{number}{ext}"
+
+def save_atomically(path, save):
+    # save(f) writes the file to a temporary file next to path that then
+    # replaces it, so a report is never seen half written
+    tmp_file = path + ".tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            save(f)
+        os.replace(tmp_file, path)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+def column_formats(names, frames):
+    # Widths and style names of columns whose rows come in several frames: the
+    # widest value of any frame, and the datetime style only when every frame
+    # holding values in the column has a datetime dtype
+    widths = [len(str(name)) + 2 for name in names]
+    datetime_columns = [None] * len(names)
+    for frame in frames:
+        for position, name in enumerate(names):
+            series = frame[name]
+            widths[position] = max(widths[position], column_width(name, series))
+            if pd.api.types.is_datetime64_any_dtype(series):
+                datetime_columns[position] = datetime_columns[position] is not False
+            elif series.notna().any():
+                datetime_columns[position] = False
+    styles = [column_style_name(name, bool(is_datetime)) for name, is_datetime in zip(names, datetime_columns)]
+    return widths, styles
+
+def write_sheet(wb, title, frame):
+    # Streams one frame onto a new sheet
+    write_sheet_rows(wb, title, frame.columns, [column_width(name, frame[name]) for name in frame.columns],
+                     [column_style_name(name, pd.api.types.is_datetime64_any_dtype(frame[name])) for name in frame.columns],
+                     [frame])
+
+def write_sheet_rows(wb, title, names, widths, styles, frames):
+    # Streams frames with the same columns onto a new sheet; every cell of a
+    # column reuses that column's shared named style. The style array is
+    # handed to Cell directly, which skips WriteOnlyCell's per cell named
+    # style lookup but relies on openpyxl internals (pinned in pyproject.toml)
+    ws = wb.create_sheet(title)
+    header = []
+    column_styles = []
+    for col_idx, (name, width, style) in enumerate(zip(names, widths, styles), start=1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = width
+        cell = WriteOnlyCell(ws, value=name)
+        cell.style = "Report Header"
+        header.append(cell)
+        prototype = WriteOnlyCell(ws)
+        prototype.style = style
+        column_styles.append(prototype._style)
+    ws.append(header)
+    for frame in frames:
+        columns = [frame[name].astype(object).where(frame[name].notna(), None).tolist() for name in names]
+        for values in zip(*columns):
+            ws.append([Cell(ws, row=1, column=1, value=value, style_array=style)
+                       for value, style in zip(values, column_styles)])
+
+def write_report(path, sheets):
+    # Streams (name, DataFrame) pairs into write-only workbooks, one sheet per
+    # frame in one pass. Frames longer than a sheet continue on further sheets
+    # and workbooks over the cell limit on numbered files; whenever sheets no
+    # longer match the names one to one, every file starts with an Index sheet
+    # listing where each name's rows are. Returns the paths written
+    files = report_layout(sheets)
+    paths = [report_file_path(path, number) for number in range(1, len(files) + 1)]
+    index = None
+    if len(files) > 1 or any(title != str(name)[:31] for shards in files for title, name, _, _, _ in shards):
+        index = pd.DataFrame([
+            {"Name": str(name), "File": os.path.basename(file_path), "Sheet": title,
+             "First Row": start + 1, "Last Row": stop, "Rows": stop - start}
+            for file_path, shards in zip(paths, files) for title, name, _, start, stop in shards
+        ])
+    for file_path, shards in zip(paths, files):
+        wb = Workbook(write_only=True)
+        for style in report_named_styles():
+            wb.add_named_style(style)
+        if index is not None:
+            write_sheet(wb, index_sheet, index)
+        for title, _, frame, start, stop in shards:
+            if isinstance(frame, pd.DataFrame):
+                write_sheet(wb, title, frame.iloc[start:stop])
+            else:
+                # A frame spooled to disk streams its rows back itself
+                frame.write_sheet(wb, title, start, stop)
+        save_atomically(file_path, wb.save)
+    # Drop numbered files left over from an earlier, larger report
+    number = len(files) + 1
+    while os.path.exists(report_file_path(path, number)):
+        os.remove(report_file_path(path, number))
+        number += 1
+    return paths
+
+# Group keys and aggregations of the summary sheets. Exceptions are first
+# totalled per key (and reason bitmask); totals of separate batches of
+# exceptions add up, so a summary can be folded one batch at a time
+summary_groups = [
+    (['Created user', 'Modified user', 'Department.Name'], {'Count': ('Exception Reasons', 'count')}),
+    (['Department.Name', 'Reason Code'], {'Count': ('Created user', 'count')}),
+    (['Department.Name', 'Sub Department.Name', 'Created user', 'Reason Code'],
+     {'Count': ('Net amount', 'count'), 'Total Net Amount': ('Net amount', 'sum')}),
+]
+
+def summary_totals(exception_dfs, exception_codes=None):
+    # exception_codes holds each department's reason bitmasks; when summarizing
+    # a report read from disk they are parsed from the reason strings instead.
+    # Returns None when there are no exceptions
+
+    # Filter out empty or all-NA DataFrames
+    valid_depts = [dept for dept, df in exception_dfs.items() if not df.empty and df.dropna(how='all').shape[0] > 0]
+    if not valid_depts:
+        return None
+    all_exceptions = pd.concat([exception_dfs[dept] for dept in valid_depts], ignore_index=True)
+    # Blank cells come back from the written report as missing values;
+    # keep the summaries grouping them the same way
+    all_exceptions = all_exceptions.replace("", np.nan)
+    if exception_codes is None:
+        codes = parse_reason_codes(all_exceptions['Exception Reasons'])
+    else:
+        codes = np.concatenate([exception_codes[dept] for dept in valid_depts])
+    all_exceptions['Reason Code'] = codes
+    # Rows with a missing key are left out like in pivot_table
+    return [all_exceptions.groupby(keys, observed=True).agg(**aggregations) for keys, aggregations in summary_groups]
+
+def combine_summary_totals(totals, more):
+    if totals is None:
+        return more
+    if more is None:
+        return totals
+    return [pd.concat([a, b]).groupby(level=list(range(a.index.nlevels)), observed=True).sum() for a, b in zip(totals, more)]
+
+def reason_totals(grouped):
+    # Credits each key and bitmask group's totals to every message set in its
+    # bitmask
+    keys = grouped.index.names[:-1]
+    records = []
+    for group, totals in zip(grouped.index, grouped.itertuples(index=False)):
+        for message in code_messages(group[-1]):
+            records.append(group[:-1] + (message,) + tuple(totals))
+    totals = pd.DataFrame(records, columns=keys + ['Exception Reasons List'] + list(grouped.columns))
+    return totals.groupby(keys + ['Exception Reasons List']).sum()
+
+def write_summary_report(exception_dfs, path, exception_codes=None):
+    write_summary_totals(summary_totals(exception_dfs, exception_codes), path)
+
+def write_summary_totals(totals, path):
+    if totals is None:
+        write_summary(None, None, None, path)
+    else:
+        user_counts, error_totals, detailed_totals = totals
+        write_summary(user_counts, reason_totals(error_totals), reason_totals(detailed_totals), path)
+
+def write_summary(user_counts, error_counts, detailed_summary, path):
+    # user_counts: 'Count' by Created user, Modified user and Department.Name;
+    # error_counts: 'Count' by Department.Name and Exception Reasons List;
+    # detailed_summary: 'Count' and 'Total Net Amount' by Department.Name, Sub
+    # Department.Name, Created user and Exception Reasons List. None for all
+    # three writes the "No exceptions found" summary
+    save_atomically(path, lambda f: write_summary_sheets(user_counts, error_counts, detailed_summary, f))
+
+def write_summary_sheets(user_counts, error_counts, detailed_summary, f):
+    exception_summary_writer = pd.ExcelWriter(f, engine='openpyxl')
+
+    # Handle cases where Exception_Report is empty
+    if user_counts is None:
+        empty_df = pd.DataFrame({'Summary': ['No exceptions found'], 'Count': [0]})
+        empty_df.to_excel(exception_summary_writer, sheet_name='Summary', index=False)
+        ws = exception_summary_writer.book['Summary']
+        apply_formatting(ws, ['Summary', 'Count'], ['Summary', 'Count'])
+        exception_summary_writer.close()
+    else:
+        # 1. User-wise Error Summary
+        user_summary = pd.pivot_table(
+            user_counts.reset_index(),
+            index=['Created user', 'Modified user'],
+            columns='Department.Name',
+            values='Count',
+            aggfunc='sum',
+            fill_value=0,
+            margins=True,
+            margins_name='Total'
+        )
+        user_summary.to_excel(exception_summary_writer, sheet_name='User-wise Summary')
+        ws = exception_summary_writer.book['User-wise Summary']
+        headers = user_summary.reset_index().columns.tolist()
+        apply_formatting(ws, headers, headers)
+
+        # 2. Error Type Summary: rows with a 'Created user' per error and department
+        error_type_summary = pd.pivot_table(
+            error_counts.reset_index(),
+            index='Exception Reasons List',
+            columns='Department.Name',
+            values='Count',
+            aggfunc='sum',
+            fill_value=0,
+            margins=True,
+            margins_name='Total'
+        )
+        error_type_summary.to_excel(exception_summary_writer, sheet_name='Error Type Summary')
+        ws = exception_summary_writer.book['Error Type Summary']
+        headers = error_type_summary.reset_index().columns.tolist()
+        apply_formatting(ws, headers, headers)
+
+        # 3. Detailed Error Breakdown
+        detailed_summary = detailed_summary.reset_index()
+        detailed_summary.to_excel(exception_summary_writer, sheet_name='Detailed Breakdown', index=False)
+        ws = exception_summary_writer.book['Detailed Breakdown']
+        headers = detailed_summary.columns.tolist()
+        apply_formatting(ws, headers, headers)
+
+        exception_summary_writer.close()
+
+def correction_columns(input_columns):
+    # Department.Name first, then the other input columns, the reasons and
+    # the suggested corrections when they are on
+    columns = ['Department.Name'] + [col for col in input_columns if col != 'Department.Name'] + ['Exception Reasons']
+    return columns + ['Suggested Corrections'] if config.correction_suggestions else columns
+
+def build_correction_entries(exception_dfs, input_columns):
+    # Add Department.Name to every department's exceptions
+    corrected_dfs = []
+    for sheet_name, df in exception_dfs.items():
+        if not df.empty and df.dropna(how='all').shape[0] > 0:
+            df_copy = df.copy()
+            # Ensure Department.Name is included, using sheet name if necessary
+            if 'Department.Name' not in df_copy.columns:
+                df_copy['Department.Name'] = sheet_name
+            else:
+                df_copy['Department.Name'] = df_copy['Department.Name'].fillna(sheet_name)
+            # Reindex to match input columns + Exception Reasons
+            df_copy = df_copy.reindex(columns=input_columns + ['Exception Reasons'], fill_value='')
+            corrected_dfs.append(df_copy)
+
+    # Concatenate valid DataFrames
+    if corrected_dfs:
+        correction_entries = pd.concat(corrected_dfs, ignore_index=True)
+        if config.correction_suggestions:
+            from .suggestions import suggest_corrections
+            correction_entries['Suggested Corrections'] = suggest_corrections(correction_entries)
+        # Reorder columns to have Department.Name first
+        correction_entries = correction_entries[correction_columns(input_columns)]
+    else:
+        correction_entries = pd.DataFrame(columns=correction_columns(input_columns))
+    return correction_entries
+
+def read_exception_report(path):
+    # Read all sheets from an Exception_Report.xlsx written by an earlier run;
+    # a sharded report is joined back into one frame per department from the
+    # sheets and files its Index sheet lists
+    try:
+        sheets = pd.read_excel(path, sheet_name=None)
+        if index_sheet not in sheets:
+            return sheets
+        workbooks = {os.path.basename(path): sheets}
+        parts = {}
+        for entry in sheets[index_sheet].itertuples(index=False):
+            if entry.File not in workbooks:
+                workbooks[entry.File] = pd.read_excel(os.path.join(os.path.dirname(path), entry.File), sheet_name=None)
+            parts.setdefault(str(entry.Name), []).append(workbooks[entry.File][entry.Sheet])
+        return {dept: frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True) for dept, frames in parts.items()}
+    except Exception as e:
+        raise ValueError(f"Failed to read Exception_Report.xlsx: {str(e)}")
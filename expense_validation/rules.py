@@ -0,0 +1,704 @@
+import pandas as pd
+import numpy as np
+import copy
+import time
+
+# Reference data as hashed sets for O(1) membership checks, set by load_references
+ref_files = {}
+
+no_crop_check = {
+    "Finance & Account", "Human Resource", "Administration",
+    "Information Technology", "Legal", "Accounts Receivable & MIS"
+}
+no_activity_check = no_crop_check.copy()
+no_activity_check.add("Production")
+no_activity_check.add("Processing")
+no_activity_check.add("Parent Seed")
+
+def is_not_blank(value):
+    if pd.isna(value) or value is None:
+        return False
+    val = str(value).strip().replace("\u00A0", "").replace("\u200B", "")
+    return val != "" and val.upper() not in ["N/A", "NULL", "NONE", "NA", "0", "-"]
+
+def is_blank(value):
+    return not is_not_blank(value)
+
+# Registry of every exception reason; a row's exceptions are held as a uint64
+# bitmask over these positions and only rendered as text for the reports.
+# Positions are also stored by incremental validation: append new messages,
+# never reorder, and bump RULES_VERSION when a message is removed
+reason_messages = [
+    "Incorrect Location Name",
+    "Incorrect Activity Name",
+    "FC-Vertical Name cannot be blank",
+    "Crop Name cannot be blank",
+    "Incorrect Crop Name starting with ZZ",
+    "Incorrect Crop Name for FC-field crop Vertical",
+    "Incorrect Crop Name for VC-Veg Crop Vertical",
+    "Incorrect Crop Name for Fruit Crop Vertical",
+    "Incorrect Crop Name for Common vertical",
+    "Incorrect Crop Name for Root Stock Crop Vertical",
+    "Region Name should be blank for this Account Code",
+    "Zone Name should be blank for this Account Code",
+    "Incorrect Sub Department Name",
+    "Incorrect Function Name",
+    "Incorrect FC-Vertical Name",
+    "Sub Department should be blank",
+    "Need to update Zone can not left Blank",
+    "Need to update Zone Name can not left Blank",
+    "Incorrect Zone Name for FC-field crop Vertical",
+    "Incorrect Zone Name for VC-Veg Crop Vertical",
+    "Need to Update Processing Location",
+    "Incorrect Activity Name for Lab QC",
+    "Incorrect Activity Name for Field QA",
+    "Incorrect Activity Name for Bio Tech Services",
+    "Activity Name cannot be blank or start with ZZ",
+    "Incorrect Activity Name for Biotech - Markers",
+    "Incorrect Activity Name for Biotech - Tissue Culture",
+    "Incorrect Activity Name for Biotech - Mutation",
+    "Incorrect Activity Name for Entomology",
+    "Incorrect Activity Name for Pathology",
+    "Incorrect Activity Name for Bioinformatics",
+    "Incorrect Activity Name for Biochemistry",
+    "Incorrect Activity Name for Common",
+    "Incorrect Activity Name for Sales",
+    "Need to update Business Unit can not left Blank",
+    "Incorrect Business Unit Name for FC-field crop Vertical",
+    "Incorrect Zone Name for Root Stock Crop Vertical",
+    "Need to update Region Name can not left Blank",
+    "Incorrect Region Name for FC-field crop Vertical",
+    "Incorrect Business Unit Name for VC-Veg Crop Vertical",
+    "Incorrect Region Name for VC-Veg Crop Vertical",
+    "Incorrect Business Unit Name for Root Stock Crop Vertical",
+    "Incorrect Region Name for Root Stock Crop Vertical",
+    "Region, Zone, BU need to check for Root Stock",
+    "Incorrect Activity Name for Marketing",
+]
+reason_bits = {message: bit for bit, message in enumerate(reason_messages)}
+
+def reason_code(reasons):
+    # Bitmask of a list of messages, e.g. the result of validate_row
+    code = 0
+    for reason in reasons:
+        code |= 1 << reason_bits[reason]
+    return code
+
+def parse_reason_codes(reasons):
+    # Bitmasks of "; "-joined reason strings read from an existing report
+    codes, uniques = pd.factorize(reasons)
+    parsed = []
+    for joined in uniques:
+        try:
+            parsed.append(reason_code(joined.split("; ")))
+        except KeyError as e:
+            raise ValueError(f"Unknown exception reason {str(e)} in the Exception Report")
+    return np.array(parsed, dtype=np.uint64)[codes]
+
+def code_messages(code):
+    return [message for bit, message in enumerate(reason_messages) if int(code) >> bit & 1]
+
+# Validation logic
+def validate_row(dept, row):
+    reasons = []
+    sub_dept = str(row.get("Sub Department.Name", "") or "").strip().replace("\u00A0", "").replace("\u200B", "")
+    func = str(row.get("Function.Name", "") or "").strip()
+    vertical = str(row.get("FC-Vertical.Name", "") or "").strip()
+    loc = str(row.get("Location.Name", "") or "").strip()
+    crop = str(row.get("Crop.Name", "") or "").strip()
+    act = str(row.get("Activity.Name", "") or "").strip()
+    region = row.get("Region.Name", "")
+    zone = row.get("Zone.Name", "")
+    bu = row.get("Business Unit.Name", "")
+    account_code = str(row.get("Account.Code", "") or "").strip()
+
+    # Generic checks
+    if is_blank(loc) or loc.startswith("ZZ"):
+        reasons.append("Incorrect Location Name")
+    if dept not in no_activity_check and dept not in ["Breeding", "Trialing & PD", "Sales", "Marketing", "Breeding Support"]:
+        if is_blank(act) or act.startswith("ZZ"):
+            reasons.append("Incorrect Activity Name")
+    # Crop and Vertical validation for all departments except those in no_crop_check
+    if dept not in no_crop_check:
+        if is_blank(vertical):
+            reasons.append("FC-Vertical Name cannot be blank")
+        if is_blank(crop):
+            reasons.append("Crop Name cannot be blank")
+        elif crop.startswith("ZZ"):
+            reasons.append("Incorrect Crop Name starting with ZZ")
+        elif vertical == "FC-field crop" and crop not in ref_files["FC_Crop"]:
+            reasons.append("Incorrect Crop Name for FC-field crop Vertical")
+        elif vertical == "VC-Veg Crop" and crop not in ref_files["VC_Crop"]:
+            reasons.append("Incorrect Crop Name for VC-Veg Crop Vertical")
+        elif vertical == "Fruit Crop" and crop not in ref_files["Fruit_Crop"]:
+            reasons.append("Incorrect Crop Name for Fruit Crop Vertical")
+        elif vertical == "Common" and crop not in ref_files["Common_Crop"]:
+            reasons.append("Incorrect Crop Name for Common vertical")
+        elif vertical == "Root Stock" and crop not in ref_files["Root Stock_Crop"]:
+            reasons.append("Incorrect Crop Name for Root Stock Crop Vertical")
+    # Account Code exclusion checks
+    if account_code in ref_files["Region_Excluded_Accounts"] and is_not_blank(region):
+        reasons.append("Region Name should be blank for this Account Code")
+    if account_code in ref_files["Zone_Excluded_Accounts"] and is_not_blank(zone):
+        reasons.append("Zone Name should be blank for this Account Code")
+
+    # Department-specific checks
+    if dept == "Parent Seed":
+        if sub_dept not in ["Breeder Seed Production", "Foundation Seed Production", "Processing FS"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Supply Chain":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+
+    elif dept == "Production":
+        if sub_dept not in ["Commercial Seed Production", "Seed Production Research"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Supply Chain":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+        # Zone validation for Commercial Seed Production sub-department
+        if sub_dept == "Commercial Seed Production":
+            if vertical == "FC-field crop":
+                if is_blank(zone):
+                    reasons.append("Need to update Zone can not left Blank")
+                elif zone not in ref_files["ProductionFC_Zone"]:
+                    reasons.append("Incorrect Zone Name for FC-field crop Vertical")
+            elif vertical == "VC-Veg Crop":
+                if is_blank(zone):
+                    reasons.append("Need to update Zone can not left Blank")
+                elif zone not in ref_files["ProductionVC_Zone"]:
+                    reasons.append("Incorrect Zone Name for VC-Veg Crop Vertical")
+            elif vertical == "Common" and is_blank(zone):
+                reasons.append("Need to update Zone Name can not left Blank")
+
+    elif dept == "Processing":
+        if sub_dept not in ["Processing", "Warehousing", "Project & Maintenance"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Supply Chain":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+        if loc not in ["Bandamailaram", "Deorjhal", "Boriya"]:
+            reasons.append("Need to Update Processing Location")
+
+    elif dept == "Quality Assurance":
+        if sub_dept not in ["Field QA", "Lab QC", "Bio Tech Services"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Supply Chain":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+        # Sub-department-specific activity checks
+        if sub_dept == "Lab QC" and act not in ["Lab Operations QA", "All Activity"]:
+            reasons.append("Incorrect Activity Name for Lab QC")
+        if sub_dept == "Field QA" and act not in ["Field Operations QA", "All Activity"]:
+            reasons.append("Incorrect Activity Name for Field QA")
+        if sub_dept == "Bio Tech Services" and act not in ["Molecular", "All Activity"]:
+            reasons.append("Incorrect Activity Name for Bio Tech Services")
+
+    elif dept == "Seed Tech":
+        if sub_dept not in ["Aging Test", "Pelleting", "Priming", "Common"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Supply Chain":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+
+    elif dept == "In Licensing & Procurement":
+        if is_not_blank(sub_dept):
+            reasons.append("Sub Department should be blank")
+        if func != "Supply Chain":
+            reasons.append("Incorrect Function Name")
+        if vertical in ["", "N/A", "Common"]:
+            reasons.append("Incorrect FC-Vertical Name")
+
+    elif dept == "Breeding":
+        if is_not_blank(sub_dept):
+            reasons.append("Sub Department should be blank")
+        if func != "Research and Development":
+            reasons.append("Incorrect Function Name")
+        if vertical in ["", "N/A"]:
+            reasons.append("Incorrect FC-Vertical Name")
+        if dept not in no_activity_check and act not in ["Breeding", "All Activity", "Trialing", "Pre Breeding", "Germplasm Maintainance", "Experimental Seed Production"]:
+            reasons.append("Incorrect Activity Name")
+
+    elif dept == "Breeding Support":
+        if sub_dept not in ["Pathology", "Biotech - Tissue Culture", "Biotech - Mutation", "Biotech - Markers", "Bioinformatics", "Biochemistry", "Entomology", "Common"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Research and Development":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+        # Activity validation: Check for blank or ZZ first, then sub-department-specific checks
+        if is_blank(act) or act.startswith("ZZ"):
+            reasons.append("Activity Name cannot be blank or start with ZZ")
+        else:
+            # Sub-department-specific activity checks
+            if sub_dept == "Biotech - Markers" and act not in ["Molecular", "Grain Quality", "Seed Treatment", "All Activity"]:
+                reasons.append("Incorrect Activity Name for Biotech - Markers")
+            elif sub_dept == "Biotech - Tissue Culture" and act not in ["Tissue Culture", "All Activity"]:
+                reasons.append("Incorrect Activity Name for Biotech - Tissue Culture")
+            elif sub_dept == "Biotech - Mutation" and act not in ["Mutation", "All Activity"]:
+                reasons.append("Incorrect Activity Name for Biotech - Mutation")
+            elif sub_dept == "Entomology" and act not in ["Entomology", "All Activity"]:
+                reasons.append("Incorrect Activity Name for Entomology")
+            elif sub_dept == "Pathology" and act not in ["Pathalogy", "All Activity"]:
+                reasons.append("Incorrect Activity Name for Pathology")
+            elif sub_dept == "Bioinformatics" and act not in ["Bioinformatics", "All Activity"]:
+                reasons.append("Incorrect Activity Name for Bioinformatics")
+            elif sub_dept == "Biochemistry" and act not in ["Biochemistry", "All Activity"]:
+                reasons.append("Incorrect Activity Name for Biochemistry")
+            elif sub_dept == "Common" and act not in ["All Activity"]:
+                reasons.append("Incorrect Activity Name for Common")
+
+    elif dept == "Trialing & PD":
+        if is_not_blank(sub_dept):
+            reasons.append("Sub Department should be blank")
+        if func != "Research and Development":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+        if dept not in no_activity_check and act not in ["CT", "All Activity", "Trialing", "RST"]:
+            reasons.append("Incorrect Activity Name")
+
+    elif dept == "Sales":
+        valid_subs = ["Sales Brand", "Sales Export", "Sales Institutional & Govt"]
+        if sub_dept not in valid_subs:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Sales and Marketing":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+        # Activity validation for Sales
+        if is_blank(act) or act.startswith("ZZ") or act not in ref_files["SalesActivity"]:
+            reasons.append("Incorrect Activity Name for Sales")
+        # Business Unit, Zone, and Region validation for Sales Brand sub-department
+        if sub_dept == "Sales Brand":
+            if vertical == "FC-field crop":
+                if is_blank(bu):
+                    reasons.append("Need to update Business Unit can not left Blank")
+                elif bu not in ref_files["FC_BU"]:
+                    reasons.append("Incorrect Business Unit Name for FC-field crop Vertical")
+                if is_blank(zone):
+                    reasons.append("Need to update Zone can not left Blank")
+                elif zone not in ref_files["SaleFC_Zone"]:
+                    reasons.append("Incorrect Zone Name for FC-field crop Vertical")
+                if is_blank(region):
+                    reasons.append("Need to update Region Name can not left Blank")
+                elif region not in ref_files["SBFC_Region"]:
+                    reasons.append("Incorrect Region Name for FC-field crop Vertical")
+            elif vertical == "VC-Veg Crop":
+                if is_blank(bu):
+                    reasons.append("Need to update Business Unit can not left Blank")
+                elif bu not in ref_files["VC_BU"]:
+                    reasons.append("Incorrect Business Unit Name for VC-Veg Crop Vertical")
+                if is_blank(zone):
+                    reasons.append("Need to update Zone can not left Blank")
+                elif zone not in ref_files["SaleVC_Zone"]:
+                    reasons.append("Incorrect Zone Name for VC-Veg Crop Vertical")
+                if is_blank(region):
+                    reasons.append("Need to update Region Name can not left Blank")
+                elif region not in ref_files["SBVC_Region"]:
+                    reasons.append("Incorrect Region Name for VC-Veg Crop Vertical")
+            elif vertical == "Root Stock":
+                if is_blank(bu):
+                    reasons.append("Need to update Business Unit can not left Blank")
+                elif bu not in ref_files["RS_BU"]:
+                    reasons.append("Incorrect Business Unit Name for Root Stock Crop Vertical")
+                if is_blank(zone):
+                    reasons.append("Need to update Zone can not left Blank")
+                elif zone not in ref_files["SaleRS_Zone"]:
+                    reasons.append("Incorrect Zone Name for Root Stock Crop Vertical")
+                if is_blank(region):
+                    reasons.append("Need to update Region Name can not left Blank")
+                elif region not in ref_files["SBRS_Region"]:
+                    reasons.append("Incorrect Region Name for Root Stock Crop Vertical")
+
+    elif dept == "Marketing":
+        valid_subs = ["Business Development", "Digital Marketing", "Product Management"]
+        if sub_dept not in valid_subs:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Sales and Marketing":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+        elif vertical == "Root Stock" and any(is_not_blank(x) for x in [region, zone, bu]):
+            reasons.append("Region, Zone, BU need to check for Root Stock")
+        # Activity validation for Marketing
+        if is_blank(act) or act.startswith("ZZ") or act not in ref_files["MarketingActivity"]:
+            reasons.append("Incorrect Activity Name for Marketing")
+
+    elif dept == "Finance & Account":
+        if sub_dept not in ["Accounts", "Finance", "Analytics, Internal Control & Budget", "Purchase ops", "Secretarial", "Document Management System", "Automation", "Group Company"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Support Functions":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+
+    elif dept == "Human Resource":
+        if sub_dept not in ["Compliances", "HR Ops", "Recruitment", "Team Welfare", "Training", "Common"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Support Functions":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+
+    elif dept == "Administration":
+        if sub_dept not in ["Events", "Maintenance", "Travel Desk","Common"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Support Functions":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+
+    elif dept == "Information Technology":
+        if sub_dept not in ["ERP Support", "Infra & Hardware", "Application Development"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Support Functions":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+
+    elif dept == "Legal":
+        if sub_dept not in ["Compliances", "Litigation","Common"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Support Functions":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+
+    elif dept == "Accounts Receivable & MIS":
+        if sub_dept not in ["Branch and C&F Ops", "Commercial & AR Management", "Common", "Order Processing", "Transport & Logistic"]:
+            reasons.append("Incorrect Sub Department Name")
+        if func != "Support Functions":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+
+    elif dept == "Management":
+        if is_not_blank(sub_dept):
+            reasons.append("Sub Department should be blank")
+        if func != "Management":
+            reasons.append("Incorrect Function Name")
+        if is_blank(vertical):
+            reasons.append("Incorrect FC-Vertical Name")
+
+    return reasons
+
+# Vectorized validation engine
+# Every check in validate_row is evaluated as a boolean mask over the whole
+# department frame. Masks are collected in the same order validate_row appends
+# its reasons, so the joined "Exception Reasons" strings are identical.
+crop_reference_checks = [
+    ("FC-field crop", "FC_Crop", "Incorrect Crop Name for FC-field crop Vertical"),
+    ("VC-Veg Crop", "VC_Crop", "Incorrect Crop Name for VC-Veg Crop Vertical"),
+    ("Fruit Crop", "Fruit_Crop", "Incorrect Crop Name for Fruit Crop Vertical"),
+    ("Common", "Common_Crop", "Incorrect Crop Name for Common vertical"),
+    ("Root Stock", "Root Stock_Crop", "Incorrect Crop Name for Root Stock Crop Vertical"),
+]
+
+# Sales Brand BU/Zone/Region reference lists and messages per vertical
+sales_brand_checks = {
+    "FC-field crop": (("FC_BU", "SaleFC_Zone", "SBFC_Region"), "FC-field crop Vertical"),
+    "VC-Veg Crop": (("VC_BU", "SaleVC_Zone", "SBVC_Region"), "VC-Veg Crop Vertical"),
+    "Root Stock": (("RS_BU", "SaleRS_Zone", "SBRS_Region"), "Root Stock Crop Vertical"),
+}
+
+# Valid sub departments and expected function for departments that only run the standard checks
+standard_dept_checks = {
+    "Parent Seed": (["Breeder Seed Production", "Foundation Seed Production", "Processing FS"], "Supply Chain"),
+    "Seed Tech": (["Aging Test", "Pelleting", "Priming", "Common"], "Supply Chain"),
+    "Finance & Account": (["Accounts", "Finance", "Analytics, Internal Control & Budget", "Purchase ops", "Secretarial", "Document Management System", "Automation", "Group Company"], "Support Functions"),
+    "Human Resource": (["Compliances", "HR Ops", "Recruitment", "Team Welfare", "Training", "Common"], "Support Functions"),
+    "Administration": (["Events", "Maintenance", "Travel Desk", "Common"], "Support Functions"),
+    "Information Technology": (["ERP Support", "Infra & Hardware", "Application Development"], "Support Functions"),
+    "Legal": (["Compliances", "Litigation", "Common"], "Support Functions"),
+    "Accounts Receivable & MIS": (["Branch and C&F Ops", "Commercial & AR Management", "Common", "Order Processing", "Transport & Logistic"], "Support Functions"),
+}
+
+breeding_support_activities = [
+    ("Biotech - Markers", ["Molecular", "Grain Quality", "Seed Treatment", "All Activity"]),
+    ("Biotech - Tissue Culture", ["Tissue Culture", "All Activity"]),
+    ("Biotech - Mutation", ["Mutation", "All Activity"]),
+    ("Entomology", ["Entomology", "All Activity"]),
+    ("Pathology", ["Pathalogy", "All Activity"]),
+    ("Bioinformatics", ["Bioinformatics", "All Activity"]),
+    ("Biochemistry", ["Biochemistry", "All Activity"]),
+    ("Common", ["All Activity"]),
+]
+
+def clean_text(value):
+    return str(value or "").strip()
+
+def clean_sub_dept(value):
+    return clean_text(value).replace("\u00A0", "").replace("\u200B", "")
+
+def get_column(dept_df, column):
+    # Missing columns behave like row.get(column, "")
+    if column in dept_df.columns:
+        return dept_df[column]
+    return pd.Series("", index=dept_df.index, dtype=object)
+
+def map_distinct(values, func, dtype=bool):
+    # Evaluate func once per distinct value and broadcast the result to every row
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.array([func(value) for value in uniques], dtype=dtype)[codes]
+
+def is_in(values, options):
+    return map_distinct(values, lambda value: value in options)
+
+class NormalizedColumn:
+    # A column factorized once: per-row codes into its distinct values, each
+    # distinct value cleaned once, and the blank and "ZZ" flags of the cleaned
+    # values. Checks run per distinct value and are broadcast through codes,
+    # so their cost follows the column's cardinality instead of its length
+    def __init__(self, codes, raw, clean=None):
+        self.codes = codes
+        self.raw = raw
+        self.values = raw if clean is None else np.array([clean(value) for value in raw], dtype=object)
+        self.blank_values = np.array([is_blank(value) for value in self.values], dtype=bool)
+        self.zz_values = np.array([isinstance(value, str) and value.startswith("ZZ") for value in self.values], dtype=bool)
+
+    @classmethod
+    def from_values(cls, values, clean=None):
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        return cls(codes, np.asarray(uniques, dtype=object), clean)
+
+    def take(self, rows):
+        # The same distinct values and flags for a subset of the rows
+        column = copy.copy(self)
+        column.codes = self.codes[rows]
+        return column
+
+    @property
+    def blank(self):
+        return self.blank_values[self.codes]
+
+    @property
+    def zz(self):
+        return self.zz_values[self.codes]
+
+    def eq(self, value):
+        return (self.values == value)[self.codes]
+
+    def isin(self, options):
+        return np.array([value in options for value in self.values], dtype=bool)[self.codes]
+
+    def map_raw(self, func):
+        return np.array([func(value) for value in self.raw], dtype=bool)[self.codes]
+
+# Columns the checks read and how their distinct values are cleaned; region,
+# zone and business unit are compared with the reference lists as they are
+normalized_columns = {
+    "Department.Name": clean_text,
+    "Sub Department.Name": clean_sub_dept,
+    "Function.Name": clean_text,
+    "FC-Vertical.Name": clean_text,
+    "Location.Name": clean_text,
+    "Crop.Name": clean_text,
+    "Activity.Name": clean_text,
+    "Account.Code": clean_text,
+    "Region.Name": None,
+    "Zone.Name": None,
+    "Business Unit.Name": None,
+}
+
+def normalize_frame(df):
+    # Normalization stage: one NormalizedColumn per checked column. Categorical
+    # columns factorize on their categories, so this is a pass over int codes
+    return {column: NormalizedColumn.from_values(get_column(df, column), clean) for column, clean in normalized_columns.items()}
+
+def reason_codes(checks, size):
+    # Each failed check sets its registry bit in the row's bitmask
+    codes = np.zeros(size, dtype=np.uint64)
+    for message, mask in checks:
+        codes |= mask.astype(np.uint64) << np.uint64(reason_bits[message])
+    return codes
+
+def render_reasons(codes, order):
+    # Rows with the same bitmask share one joined string; messages are joined
+    # in the department's check order, the order validate_row appends them in
+    if len(codes) == 0:
+        return np.full(0, "", dtype=object)
+    patterns, inverse = np.unique(codes, return_inverse=True)
+    joined = np.array([
+        "; ".join(reason_messages[bit] for bit in order if int(value) >> bit & 1)
+        for value in patterns
+    ], dtype=object)
+    return joined[inverse.ravel()]
+
+# Per-rule [evaluations, hits, seconds] of the department being validated
+rule_metrics = {}
+
+class RuleChecks(list):
+    # Check list that records each rule as it is appended: the rows it was
+    # evaluated on, the rows it flagged and the time since the previous append
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+        self.last = time.perf_counter()
+
+    def append(self, check):
+        now = time.perf_counter()
+        message, mask = check
+        metrics = rule_metrics.setdefault(message, [0, 0, 0.0])
+        metrics[0] += self.size
+        metrics[1] += int(np.count_nonzero(mask))
+        metrics[2] += now - self.last
+        self.last = now
+        super().append(check)
+
+def validate_frame(dept, dept_df, normalized=None):
+    # normalized is the normalize_frame output for dept_df's rows
+    if normalized is None:
+        normalized = normalize_frame(dept_df)
+    sub_dept = normalized["Sub Department.Name"]
+    func = normalized["Function.Name"]
+    vertical = normalized["FC-Vertical.Name"]
+    loc = normalized["Location.Name"]
+    crop = normalized["Crop.Name"]
+    act = normalized["Activity.Name"]
+    region = normalized["Region.Name"]
+    zone = normalized["Zone.Name"]
+    bu = normalized["Business Unit.Name"]
+    account_code = normalized["Account.Code"]
+
+    vertical_blank = vertical.blank
+    act_blank_or_zz = act.blank | act.zz
+    region_blank = region.blank
+    zone_blank = zone.blank
+    checks = RuleChecks(len(dept_df))
+
+    # Generic checks
+    checks.append(("Incorrect Location Name", loc.blank | loc.zz))
+    if dept not in no_activity_check and dept not in ["Breeding", "Trialing & PD", "Sales", "Marketing", "Breeding Support"]:
+        checks.append(("Incorrect Activity Name", act_blank_or_zz))
+    # Crop and Vertical validation for all departments except those in no_crop_check
+    if dept not in no_crop_check:
+        checks.append(("FC-Vertical Name cannot be blank", vertical_blank))
+        crop_blank = crop.blank
+        crop_zz = ~crop_blank & crop.zz
+        checks.append(("Crop Name cannot be blank", crop_blank))
+        checks.append(("Incorrect Crop Name starting with ZZ", crop_zz))
+        for vertical_name, ref_key, message in crop_reference_checks:
+            checks.append((message, ~crop_blank & ~crop_zz & vertical.eq(vertical_name) & ~crop.isin(ref_files[ref_key])))
+    # Account Code exclusion checks
+    checks.append(("Region Name should be blank for this Account Code", account_code.isin(ref_files["Region_Excluded_Accounts"]) & ~region_blank))
+    checks.append(("Zone Name should be blank for this Account Code", account_code.isin(ref_files["Zone_Excluded_Accounts"]) & ~zone_blank))
+
+    # Department-specific checks
+    if dept in standard_dept_checks:
+        valid_subs, expected_func = standard_dept_checks[dept]
+        checks.append(("Incorrect Sub Department Name", ~sub_dept.isin(valid_subs)))
+        checks.append(("Incorrect Function Name", ~func.eq(expected_func)))
+        checks.append(("Incorrect FC-Vertical Name", vertical_blank))
+
+    elif dept == "Production":
+        checks.append(("Incorrect Sub Department Name", ~sub_dept.isin(["Commercial Seed Production", "Seed Production Research"])))
+        checks.append(("Incorrect Function Name", ~func.eq("Supply Chain")))
+        checks.append(("Incorrect FC-Vertical Name", vertical_blank))
+        # Zone validation for Commercial Seed Production sub-department
+        commercial = sub_dept.eq("Commercial Seed Production")
+        fc_zone = commercial & vertical.eq("FC-field crop")
+        vc_zone = commercial & vertical.eq("VC-Veg Crop")
+        checks.append(("Need to update Zone can not left Blank", (fc_zone | vc_zone) & zone_blank))
+        checks.append(("Incorrect Zone Name for FC-field crop Vertical", fc_zone & ~zone_blank & ~zone.isin(ref_files["ProductionFC_Zone"])))
+        checks.append(("Incorrect Zone Name for VC-Veg Crop Vertical", vc_zone & ~zone_blank & ~zone.isin(ref_files["ProductionVC_Zone"])))
+        checks.append(("Need to update Zone Name can not left Blank", commercial & vertical.eq("Common") & zone_blank))
+
+    elif dept == "Processing":
+        checks.append(("Incorrect Sub Department Name", ~sub_dept.isin(["Processing", "Warehousing", "Project & Maintenance"])))
+        checks.append(("Incorrect Function Name", ~func.eq("Supply Chain")))
+        checks.append(("Incorrect FC-Vertical Name", vertical_blank))
+        checks.append(("Need to Update Processing Location", ~loc.isin(["Bandamailaram", "Deorjhal", "Boriya"])))
+
+    elif dept == "Quality Assurance":
+        checks.append(("Incorrect Sub Department Name", ~sub_dept.isin(["Field QA", "Lab QC", "Bio Tech Services"])))
+        checks.append(("Incorrect Function Name", ~func.eq("Supply Chain")))
+        checks.append(("Incorrect FC-Vertical Name", vertical_blank))
+        # Sub-department-specific activity checks
+        checks.append(("Incorrect Activity Name for Lab QC", sub_dept.eq("Lab QC") & ~act.isin(["Lab Operations QA", "All Activity"])))
+        checks.append(("Incorrect Activity Name for Field QA", sub_dept.eq("Field QA") & ~act.isin(["Field Operations QA", "All Activity"])))
+        checks.append(("Incorrect Activity Name for Bio Tech Services", sub_dept.eq("Bio Tech Services") & ~act.isin(["Molecular", "All Activity"])))
+
+    elif dept == "In Licensing & Procurement":
+        checks.append(("Sub Department should be blank", ~sub_dept.blank))
+        checks.append(("Incorrect Function Name", ~func.eq("Supply Chain")))
+        checks.append(("Incorrect FC-Vertical Name", vertical.isin(["", "N/A", "Common"])))
+
+    elif dept == "Breeding":
+        checks.append(("Sub Department should be blank", ~sub_dept.blank))
+        checks.append(("Incorrect Function Name", ~func.eq("Research and Development")))
+        checks.append(("Incorrect FC-Vertical Name", vertical.isin(["", "N/A"])))
+        checks.append(("Incorrect Activity Name", ~act.isin(["Breeding", "All Activity", "Trialing", "Pre Breeding", "Germplasm Maintainance", "Experimental Seed Production"])))
+
+    elif dept == "Breeding Support":
+        checks.append(("Incorrect Sub Department Name", ~sub_dept.isin(["Pathology", "Biotech - Tissue Culture", "Biotech - Mutation", "Biotech - Markers", "Bioinformatics", "Biochemistry", "Entomology", "Common"])))
+        checks.append(("Incorrect Function Name", ~func.eq("Research and Development")))
+        checks.append(("Incorrect FC-Vertical Name", vertical_blank))
+        # Activity validation: Check for blank or ZZ first, then sub-department-specific checks
+        checks.append(("Activity Name cannot be blank or start with ZZ", act_blank_or_zz))
+        for sub_name, activities in breeding_support_activities:
+            checks.append((f"Incorrect Activity Name for {sub_name}", ~act_blank_or_zz & sub_dept.eq(sub_name) & ~act.isin(activities)))
+
+    elif dept == "Trialing & PD":
+        checks.append(("Sub Department should be blank", ~sub_dept.blank))
+        checks.append(("Incorrect Function Name", ~func.eq("Research and Development")))
+        checks.append(("Incorrect FC-Vertical Name", vertical_blank))
+        checks.append(("Incorrect Activity Name", ~act.isin(["CT", "All Activity", "Trialing", "RST"])))
+
+    elif dept == "Sales":
+        checks.append(("Incorrect Sub Department Name", ~sub_dept.isin(["Sales Brand", "Sales Export", "Sales Institutional & Govt"])))
+        checks.append(("Incorrect Function Name", ~func.eq("Sales and Marketing")))
+        checks.append(("Incorrect FC-Vertical Name", vertical_blank))
+        # Activity validation for Sales
+        checks.append(("Incorrect Activity Name for Sales", act_blank_or_zz | ~act.isin(ref_files["SalesActivity"])))
+        # Business Unit, Zone, and Region validation for Sales Brand sub-department
+        # A row takes one vertical's branch, whose blank checks share their
+        # messages with the other branches. The checks go field by field, each
+        # message appended once, so every branch's reasons keep validate_row's
+        # order (business unit, zone, region) in the department's check order
+        sales_brand = sub_dept.eq("Sales Brand")
+        branches = {vertical_name: sales_brand & vertical.eq(vertical_name) for vertical_name in sales_brand_checks}
+        any_branch = np.logical_or.reduce(list(branches.values()))
+        fields = [("Business Unit", bu, "Need to update Business Unit can not left Blank"),
+                  ("Zone", zone, "Need to update Zone can not left Blank"),
+                  ("Region", region, "Need to update Region Name can not left Blank")]
+        for position, (field, values, blank_message) in enumerate(fields):
+            values_blank = values.blank
+            checks.append((blank_message, any_branch & values_blank))
+            for vertical_name, (ref_keys, label) in sales_brand_checks.items():
+                checks.append((f"Incorrect {field} Name for {label}",
+                               branches[vertical_name] & ~values_blank & ~values.isin(ref_files[ref_keys[position]])))
+
+    elif dept == "Marketing":
+        checks.append(("Incorrect Sub Department Name", ~sub_dept.isin(["Business Development", "Digital Marketing", "Product Management"])))
+        checks.append(("Incorrect Function Name", ~func.eq("Sales and Marketing")))
+        checks.append(("Incorrect FC-Vertical Name", vertical_blank))
+        any_filled = ~region_blank | ~zone_blank | ~bu.blank
+        checks.append(("Region, Zone, BU need to check for Root Stock", ~vertical_blank & vertical.eq("Root Stock") & any_filled))
+        # Activity validation for Marketing
+        checks.append(("Incorrect Activity Name for Marketing", act_blank_or_zz | ~act.isin(ref_files["MarketingActivity"])))
+
+    elif dept == "Management":
+        checks.append(("Sub Department should be blank", ~sub_dept.blank))
+        checks.append(("Incorrect Function Name", ~func.eq("Management")))
+        checks.append(("Incorrect FC-Vertical Name", vertical_blank))
+
+    # Bitmask per row and the department's registry bits in check order. The
+    # bits of a row are rendered in this order, so a message may only be
+    # appended once per department
+    order = list(dict.fromkeys(reason_bits[message] for message, _ in checks))
+    return reason_codes(checks, len(dept_df)), order
+
+def common_usage_mask(dept_df, normalized=None):
+    # "Common" in FC-Vertical, Department or Sub Department
+    if normalized is None:
+        normalized = normalize_frame(dept_df)
+    mask = np.zeros(len(dept_df), dtype=bool)
+    for column in ["FC-Vertical.Name", "Department.Name", "Sub Department.Name"]:
+        mask |= normalized[column].map_raw(lambda value: clean_text(value) == "Common")
+    return mask
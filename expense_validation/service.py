@@ -0,0 +1,145 @@
+import os
+import re
+import sys
+import glob
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import config
+from .batch import process_file
+from .pipeline import load_references
+from .references import reference_signatures
+# The service keeps every stage loaded between files instead of importing on first use
+from . import reader, engine, reports
+
+warm_modules = (reader, engine, reports)
+
+class StatusHandler(BaseHTTPRequestHandler):
+    # GET /status returns the service status as JSON
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/status"):
+            self.send_error(404)
+            return
+        with self.server.status_lock:
+            body = json.dumps(self.server.status, indent=2).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_status_server(port, status, status_lock):
+    server = ThreadingHTTPServer(("127.0.0.1", port), StatusHandler)
+    server.status = status
+    server.status_lock = status_lock
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def input_snapshot(watch_dir):
+    # (size, mtime) of every candidate input workbook in watch_dir; our own
+    # report files (numbered shards included) and Excel's "~$" lock files are
+    # never picked up
+    report_stems = {os.path.splitext(os.path.basename(path))[0] for path in (config.exception_file, config.summary_file, config.correction_file, config.all_depts_file, config.common_usage_file)}
+    snapshot = {}
+    for path in glob.glob(os.path.join(watch_dir, "*.xlsx")):
+        name = os.path.basename(path)
+        if name.startswith("~$") or re.sub(r"_\d+$", "", os.path.splitext(name)[0]) in report_stems:
+            continue
+        stat = os.stat(path)
+        snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+def refresh_references(signatures, status, status_lock):
+    # Reloads only the reference lists whose workbook changed and returns the
+    # signatures now loaded. A missing or half-written workbook keeps the lists
+    # and signatures loaded so far; the error is reported and the next poll
+    # tries again
+    try:
+        current = reference_signatures(config.input_path)
+        changed = [key for key, signature in current.items() if signatures.get(key) != signature]
+        if changed:
+            load_references()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        with status_lock:
+            reported = status["reference_error"] is not None and status["reference_error"]["error"] == error
+            if not reported:
+                status["reference_error"] = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "error": error}
+        if not reported:
+            print(f"Reference reload failed, keeping the loaded lists: {error}", file=sys.stderr)
+        return signatures
+    with status_lock:
+        status["reference_error"] = None
+        if changed and signatures:
+            status["reference_reloads"] = (status["reference_reloads"] + [
+                {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "lists": changed}
+            ])[-20:]
+    return current
+
+def watch_folder(watch_dir, output_dir, poll_seconds=config.service_poll_seconds, status_port=config.service_status_port, process_existing=False):
+    # Keeps the interpreter, imports and references warm and validates every
+    # workbook that appears or changes in watch_dir into output_dir/<file name>
+    status_lock = threading.Lock()
+    status = {
+        "state": "starting",
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "watch_dir": watch_dir,
+        "output_dir": output_dir,
+        "current_file": None,
+        "processed": 0,
+        "failed": 0,
+        "files": [],
+        "reference_reloads": [],
+        "reference_error": None,
+    }
+    server = start_status_server(status_port, status, status_lock) if status_port else None
+    signatures = refresh_references({}, status, status_lock)
+    seen = {} if process_existing else input_snapshot(watch_dir)
+    pending = {}
+    print(f"Watching {watch_dir} every {poll_seconds}s" + (f", status on http://127.0.0.1:{status_port}/status" if server else ""))
+    try:
+        while True:
+            signatures = refresh_references(signatures, status, status_lock)
+            with status_lock:
+                status["state"] = "idle"
+            for path, signature in input_snapshot(watch_dir).items():
+                if seen.get(path) == signature:
+                    continue
+                # A file is only picked up once it has stopped changing for one poll
+                if pending.get(path) != signature:
+                    pending[path] = signature
+                    continue
+                del pending[path]
+                seen[path] = signature
+                with status_lock:
+                    status["state"] = "validating"
+                    status["current_file"] = path
+                report_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+                path, report_dir, seconds, error = process_file((path, report_dir, None))
+                with status_lock:
+                    status["current_file"] = None
+                    status["processed" if error is None else "failed"] += 1
+                    if config.memoize_combinations:
+                        status["combination_cache"] = dict(engine.combination_cache_stats, size=len(engine.combination_cache))
+                    status["files"] = (status["files"] + [{
+                        "file": path,
+                        "output_dir": report_dir,
+                        "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "seconds": round(seconds, 3),
+                        "error": error,
+                    }])[-100:]
+                if error is None:
+                    print(f"{path} -> {report_dir} ({seconds:.1f}s)")
+                else:
+                    print(f"{path} failed after {seconds:.1f}s: {error}", file=sys.stderr)
+            time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.shutdown()
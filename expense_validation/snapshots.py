@@ -0,0 +1,100 @@
+import os
+import glob
+import hashlib
+import tempfile
+
+from . import config
+from .metrics import pipeline_metrics
+
+# Input snapshots: the prepared frame of an input file is stored as an
+# uncompressed Arrow IPC file named after a hash of the file's content, so a
+# rerun on the same export maps the snapshot instead of parsing the workbook.
+# Bump snapshot_version whenever read_input prepares the frame differently
+snapshot_version = 1
+
+def import_pyarrow():
+    # Snapshots are skipped without pyarrow
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        return None
+    return pyarrow
+
+def input_digest(path):
+    # Hash of the file's content and of the settings the prepared frame depends on
+    digest = hashlib.blake2b(repr((snapshot_version, config.categorical_columns)).encode(), digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def snapshot_path(digest):
+    return os.path.join(config.input_snapshot_dir, digest + ".arrow")
+
+def load_snapshot(digest):
+    # The prepared frame of the input hashed to digest, or None. Columns
+    # without missing values are used straight from the mapped file
+    pyarrow = import_pyarrow()
+    path = snapshot_path(digest)
+    if pyarrow is None or not os.path.exists(path):
+        pipeline_metrics["input_snapshot"] = {"hit": False}
+        return None
+    try:
+        table = pyarrow.ipc.open_file(pyarrow.memory_map(path)).read_all()
+        df = table.to_pandas(split_blocks=True)
+    except (OSError, pyarrow.ArrowException):
+        # A damaged snapshot is parsed again and replaced
+        pipeline_metrics["input_snapshot"] = {"hit": False}
+        return None
+    # Marks the snapshot as recently used for the eviction
+    os.utime(path)
+    pipeline_metrics["input_snapshot"] = {"hit": True, "file": path, "bytes": os.path.getsize(path)}
+    return df
+
+def save_snapshot(digest, df):
+    # Frames Arrow cannot store (columns of mixed types) are not snapshotted
+    pyarrow = import_pyarrow()
+    if pyarrow is None:
+        return
+    try:
+        table = pyarrow.Table.from_pandas(df)
+    except (pyarrow.ArrowException, TypeError, ValueError):
+        return
+    path = snapshot_path(digest)
+    tmp_file = None
+    try:
+        os.makedirs(config.input_snapshot_dir, exist_ok=True)
+        # Batch workers snapshotting the same input each write their own file
+        fd, tmp_file = tempfile.mkstemp(prefix=digest, suffix=".tmp", dir=config.input_snapshot_dir)
+        os.close(fd)
+        with pyarrow.OSFile(tmp_file, "wb") as sink:
+            with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_file, path)
+    except (OSError, pyarrow.ArrowException):
+        # The run goes on without a snapshot when it cannot be written
+        if tmp_file is not None and os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return
+    pipeline_metrics["input_snapshot"] = {"hit": False, "file": path, "bytes": os.path.getsize(path)}
+    evict_snapshots()
+
+def evict_snapshots():
+    # Removes the least recently used snapshots past input_snapshot_max_bytes
+    snapshots = []
+    for path in glob.glob(os.path.join(config.input_snapshot_dir, "*.arrow")):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        snapshots.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in snapshots)
+    for _, size, path in sorted(snapshots):
+        if total <= config.input_snapshot_max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
@@ -0,0 +1,197 @@
+import os
+import pickle
+import itertools
+import tempfile
+
+import pandas as pd
+
+from . import config, rules
+from .engine import validate_departments
+from .history import connect_history, start_run, add_exceptions, finish_run
+from .metrics import pipeline_metrics, pipeline_stage
+from .parallel import JobScheduler
+from .pipeline import load_references
+from .reader import read_input_chunks
+from .reports import (write_report, write_sheet_rows, column_formats, summary_totals, combine_summary_totals,
+                      write_summary_totals, build_correction_entries, correction_columns)
+
+# Streaming mode: the input is read, validated and spooled to disk a chunk at
+# a time, and the summary is folded from each chunk's totals, so memory
+# follows the chunk size instead of the file size. The reports are then
+# streamed from the spool into the write-only workbooks
+
+# Half the budget goes to the rows of a chunk and half to the sheet XML being
+# parsed. A piece of XML takes about xml_memory_factor times its size while it
+# is parsed, and a row about row_memory_factor times the size of its values
+# while it is validated (the cell lists, the frame, its copy sorted by
+# department and the output, exception and common usage slices). The shared
+# strings of the workbook are held throughout, as in a full read. The reports
+# are written from the spool one chunk at a time on each of report_workers
+xml_memory_factor = 28
+row_memory_factor = 4
+# Rows of the first chunk, from which the size of a row is estimated
+first_chunk_rows = 5000
+
+def row_bytes(df):
+    # Average size of a row's values, counting categorical columns as the
+    # values they were parsed as
+    size = 0
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype(object)
+        size += series.memory_usage(deep=True, index=False)
+    return size / max(len(df), 1)
+
+class SpooledFrame:
+    # Rows of one report sheet, pickled to path a chunk at a time and read
+    # back a chunk at a time. report_layout and write_report use it like a frame
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        # (file offset, rows) of every stored chunk
+        self.chunks = []
+        self.rows = 0
+        # Column types of the first chunk, for the styles of an empty sheet
+        self.template = None
+
+    def __len__(self):
+        return self.rows
+
+    def append(self, frame):
+        if self.template is None:
+            self.template = frame.iloc[:0]
+        if len(frame) == 0:
+            return
+        with open(self.path, "ab") as f:
+            self.chunks.append((f.tell(), len(frame)))
+            pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows += len(frame)
+
+    def frames(self, start=0, stop=None):
+        # Rows start:stop, one stored chunk at a time
+        stop = self.rows if stop is None else stop
+        if not self.chunks:
+            return
+        first = 0
+        with open(self.path, "rb") as f:
+            for offset, rows in self.chunks:
+                if first < stop and first + rows > start:
+                    f.seek(offset)
+                    yield pickle.load(f).iloc[max(start - first, 0):stop - first]
+                first += rows
+
+    def write_sheet(self, wb, title, start, stop):
+        # Widths and styles take one pass over the rows, writing a second
+        templates = [] if self.template is None else [self.template]
+        widths, styles = column_formats(self.columns, itertools.chain(templates, self.frames(start, stop)))
+        write_sheet_rows(wb, title, self.columns, widths, styles, self.frames(start, stop))
+
+def add_department_metrics(totals, departments):
+    # Sums a chunk's department and rule metrics into totals, keyed by department
+    for metrics in departments:
+        total = totals.setdefault(metrics["department"], {"department": metrics["department"], "rules": []})
+        for key, value in metrics.items():
+            if key not in ("department", "rules"):
+                total[key] = round(total.get(key, 0) + value, 6)
+        rule_totals = {rule["rule"]: rule for rule in total["rules"]}
+        for rule in metrics["rules"]:
+            if rule["rule"] not in rule_totals:
+                rule_totals[rule["rule"]] = dict(rule)
+                total["rules"].append(rule_totals[rule["rule"]])
+                continue
+            rule_total = rule_totals[rule["rule"]]
+            rule_total["evaluations"] += rule["evaluations"]
+            rule_total["hits"] += rule["hits"]
+            if rule_total["seconds"] is not None and rule["seconds"] is not None:
+                rule_total["seconds"] = round(rule_total["seconds"] + rule["seconds"], 6)
+
+def stream_reports(path=None, workers=None):
+    # Validates path (default: data_file) a chunk at a time within
+    # streaming_memory_budget and writes the workbooks and the summary to the
+    # configured report paths; returns the number of rows validated
+    if config.output_format != "excel":
+        raise ValueError(f"Streaming mode writes excel reports; output_format '{config.output_format}' is not supported")
+    path = path or config.data_file
+    if workers is None:
+        workers = config.validation_workers
+    if not rules.ref_files:
+        with pipeline_stage("load_references", 0):
+            load_references()
+
+    with tempfile.TemporaryDirectory(prefix="expense_validation_", dir=config.streaming_spool_dir) as spool_dir:
+        # The read workers keep two pieces of XML each in flight
+        in_flight = 1 if config.input_read_workers <= 1 else 2 * config.input_read_workers
+        chunk_bytes = int(max(min(config.input_chunk_bytes, config.streaming_memory_budget / 2 / (xml_memory_factor * in_flight)), 65536))
+        chunk_size = {"rows": first_chunk_rows, "bytes_per_row": 0}
+        # Department -> (output, exceptions, common usage) spools in first-appearance order
+        spools = {}
+        totals = None
+        department_metrics = {}
+        input_columns = None
+        rows = 0
+        chunks = 0
+        # The run's exceptions go into the history store chunk by chunk and are
+        # committed once the whole input is validated
+        history = None
+        if config.history_file is not None:
+            history = connect_history()
+            run_id, run_date = start_run(history, path)
+        try:
+            with pipeline_stage("stream_validate", 0) as stage:
+                for df in read_input_chunks(path, lambda: chunk_size["rows"], config.input_read_workers, chunk_bytes):
+                    # Chunks are sized from the largest rows seen so far
+                    chunk_size["bytes_per_row"] = max(chunk_size["bytes_per_row"], row_bytes(df))
+                    chunk_size["rows"] = max(int(config.streaming_memory_budget / 2 / (chunk_size["bytes_per_row"] * row_memory_factor)), 1)
+                    if input_columns is None:
+                        input_columns = df.columns.tolist()
+                    dept_dfs, exception_dfs, common_usage_dfs, exception_codes = validate_departments(df, input_columns, workers)
+                    for dept, dept_df in dept_dfs.items():
+                        if dept not in spools:
+                            number = len(spools)
+                            spools[dept] = (
+                                SpooledFrame(os.path.join(spool_dir, f"{number}.output"), input_columns),
+                                SpooledFrame(os.path.join(spool_dir, f"{number}.exceptions"), input_columns + ['Exception Reasons']),
+                                SpooledFrame(os.path.join(spool_dir, f"{number}.common_usage"), input_columns),
+                            )
+                        for spool, frame in zip(spools[dept], (dept_df, exception_dfs[dept], common_usage_dfs[dept])):
+                            spool.append(frame)
+                    totals = combine_summary_totals(totals, summary_totals(exception_dfs, exception_codes))
+                    if history is not None:
+                        add_exceptions(history, run_id, run_date, exception_dfs, exception_codes)
+                    add_department_metrics(department_metrics, pipeline_metrics["departments"])
+                    rows += len(df)
+                    chunks += 1
+                stage["rows"] = rows
+            if history is not None:
+                finish_run(history, run_id)
+        finally:
+            if history is not None:
+                history.close()
+        pipeline_metrics["departments"] = list(department_metrics.values())
+        pipeline_metrics["streaming"] = {
+            "chunks": chunks,
+            "chunk_rows": chunk_size["rows"],
+            "chunk_bytes": chunk_bytes,
+            "bytes_per_row": round(chunk_size["bytes_per_row"], 1),
+            "memory_budget": config.streaming_memory_budget,
+        }
+        input_columns = input_columns or []
+
+        exception_rows = sum(len(exceptions) for _, exceptions, _ in spools.values())
+        with JobScheduler(config.report_workers) as scheduler:
+            scheduler.submit("write_all_departments", rows, write_report,
+                             config.all_depts_file, [(str(dept), output) for dept, (output, _, _) in spools.items()])
+            scheduler.submit("write_exception_report", exception_rows, write_report,
+                             config.exception_file, [(str(dept), exceptions) for dept, (_, exceptions, _) in spools.items()])
+            scheduler.submit("write_common_usage", sum(len(common_usage) for _, _, common_usage in spools.values()), write_report,
+                             config.common_usage_file, [(str(dept), common_usage) for dept, (_, _, common_usage) in spools.items()])
+            scheduler.submit("write_summary_report", exception_rows, write_summary_totals, totals, config.summary_file)
+            with pipeline_stage("build_correction_entries", exception_rows):
+                correction_entries = SpooledFrame(os.path.join(spool_dir, "correction_entries"), correction_columns(input_columns))
+                for dept, (_, exceptions, _) in spools.items():
+                    for frame in exceptions.frames():
+                        correction_entries.append(build_correction_entries({dept: frame}, input_columns))
+            scheduler.submit("write_correction_entries", exception_rows, write_report,
+                             config.correction_file, [('Correction Entries', correction_entries)])
+    return rows
@@ -0,0 +1,124 @@
+import collections
+
+import pandas as pd
+import numpy as np
+
+from . import config, rules
+from .rules import (crop_reference_checks, sales_brand_checks, reason_bits, parse_reason_codes, clean_text, is_blank,
+                    get_column, map_distinct)
+
+# Correction suggestions: a value flagged by one of these reasons gets the
+# closest entry of the reference list the check compared it with. Entries are
+# (reason message, column, {column: value} the row must have, reference list);
+# the conditions tell apart checks that share a message
+suggestion_checks = [(message, "Crop.Name", {}, key) for _, key, message in crop_reference_checks]
+suggestion_checks += [("Incorrect Crop Name starting with ZZ", "Crop.Name", {"FC-Vertical.Name": vertical}, key)
+                      for vertical, key, _ in crop_reference_checks]
+suggestion_checks += [
+    ("Incorrect Zone Name for FC-field crop Vertical", "Zone.Name", {"Department.Name": "Production"}, "ProductionFC_Zone"),
+    ("Incorrect Zone Name for VC-Veg Crop Vertical", "Zone.Name", {"Department.Name": "Production"}, "ProductionVC_Zone"),
+    ("Incorrect Activity Name for Sales", "Activity.Name", {}, "SalesActivity"),
+    ("Incorrect Activity Name for Marketing", "Activity.Name", {}, "MarketingActivity"),
+]
+for vertical, (keys, label) in sales_brand_checks.items():
+    for column, key in zip(["Business Unit.Name", "Zone.Name", "Region.Name"], keys):
+        suggestion_checks.append((f"Incorrect {column.split('.')[0]} Name for {label}", column,
+                                  {"Department.Name": "Sales", "FC-Vertical.Name": vertical}, key))
+
+# Entries sharing the most trigrams with a value that are compared by edit distance
+suggestion_candidates = 10
+
+def suggestion_key(value):
+    # Case, spacing and a retired "ZZ" prefix do not count against a match
+    text = " ".join(str(value).split()).casefold()
+    if text.startswith("zz"):
+        text = text[2:].lstrip(" -_")
+    return text
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a, b):
+    # Levenshtein distance
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+class SuggestionIndex:
+    # Trigram inverted index over a reference list. A value's candidates are
+    # the entries sharing the largest part of their trigrams with it; the one
+    # closest by edit distance is suggested when at least
+    # suggestion_min_similarity of it matches. Each distinct value is looked
+    # up once
+    def __init__(self, options):
+        self.options = sorted(str(option) for option in options)
+        self.keys = [suggestion_key(option) for option in self.options]
+        self.grams = [trigrams(key) for key in self.keys]
+        self.postings = collections.defaultdict(list)
+        for number, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings[gram].append(number)
+        self.suggestions = {}
+
+    def suggest(self, value):
+        if is_blank(value):
+            return None
+        if value not in self.suggestions:
+            self.suggestions[value] = self.closest(suggestion_key(value))
+        return self.suggestions[value]
+
+    def closest(self, key):
+        grams = trigrams(key)
+        shared = collections.Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        # Jaccard similarity of the trigram sets
+        candidates = sorted(shared, key=lambda number: (-shared[number] / (len(grams) + len(self.grams[number]) - shared[number]), number))
+        similarities = {number: 1 - edit_distance(key, self.keys[number]) / max(len(key), len(self.keys[number]), 1)
+                        for number in candidates[:suggestion_candidates]}
+        if not similarities:
+            return None
+        # Ties go to the entry with more trigrams in common
+        best = max(similarities, key=similarities.get)
+        return self.options[best] if similarities[best] >= config.suggestion_min_similarity else None
+
+# Indexes of the loaded reference lists, built on first use and kept until
+# other references are loaded
+suggestion_indexes = {}
+suggestion_index_references = None
+
+def reference_index(key):
+    global suggestion_index_references
+    if suggestion_index_references is not rules.ref_files:
+        suggestion_indexes.clear()
+        suggestion_index_references = rules.ref_files
+    if key not in suggestion_indexes:
+        suggestion_indexes[key] = SuggestionIndex(rules.ref_files.get(key, ()))
+    return suggestion_indexes[key]
+
+def suggest_corrections(entries):
+    # "column: suggestion" texts of each correction entry, "; "-joined
+    suggestions = [[] for _ in range(len(entries))]
+    codes = parse_reason_codes(entries['Exception Reasons']) if len(entries) else np.zeros(0, dtype=np.uint64)
+    for message, column, conditions, key in suggestion_checks:
+        if column not in entries.columns:
+            continue
+        rows = (codes >> np.uint64(reason_bits[message])) & np.uint64(1) != 0
+        for condition_column, expected in conditions.items():
+            if not rows.any():
+                break
+            rows &= map_distinct(get_column(entries, condition_column), lambda value: clean_text(value) == expected)
+        if not rows.any():
+            continue
+        positions = np.flatnonzero(rows)
+        values = entries[column].iloc[positions].astype(object)
+        found = map_distinct(values, reference_index(key).suggest, dtype=object)
+        for position, value, suggestion in zip(positions, values, found):
+            if suggestion is not None and suggestion != value:
+                suggestions[position].append(f"{column}: {suggestion}")
+    return pd.Series(["; ".join(texts) for texts in suggestions], index=entries.index, dtype=object)
@@ -0,0 +1,65 @@
+import os
+import random
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from expense_validation import config, rules
+
+reference_values = {
+    "FC_Crop": ["Paddy", "Maize"], "VC_Crop": ["Tomato", "Okra"], "Fruit_Crop": ["Mango"],
+    "Common_Crop": ["Common Crop"], "Root Stock_Crop": ["Rootstock Tomato"],
+    "SBFC_Region": ["FC Region North"], "SBVC_Region": ["VC Region West"], "SBRS_Region": ["RS Region Central"],
+    "SaleFC_Zone": ["FC Zone 1"], "SaleVC_Zone": ["VC Zone 1"], "SaleRS_Zone": ["RS Zone 1"],
+    "FC_BU": ["FC BU Maharashtra"], "VC_BU": ["VC BU Karnataka"], "RS_BU": ["RS BU Central"],
+    "ProductionFC_Zone": ["Production FC Zone A"], "ProductionVC_Zone": ["Production VC Zone A"],
+    "SalesActivity": ["All Activity", "Field Day"], "MarketingActivity": ["All Activity", "Campaign"],
+    "Region_Excluded_Accounts": ["410001"], "Zone_Excluded_Accounts": ["410001", "410004"],
+}
+
+departments = list(rules.standard_dept_checks) + [
+    "Production", "Processing", "Quality Assurance", "In Licensing & Procurement", "Breeding",
+    "Breeding Support", "Trialing & PD", "Sales", "Marketing", "Management",
+]
+
+# Valid, invalid and blank values of every checked field, so rows collect
+# several reasons at once
+value_pools = {
+    "Sub Department.Name": ["Sales Brand", "Sales Export", "Commercial Seed Production", "Lab QC", "Field QA",
+                            "Entomology", "Common", "Processing", "Unmapped", "", "N/A"],
+    "Function.Name": ["Sales and Marketing", "Supply Chain", "Research and Development", "Management", "Operations"],
+    "FC-Vertical.Name": ["FC-field crop", "VC-Veg Crop", "Root Stock", "Fruit Crop", "Common", "", "N/A"],
+    "Location.Name": ["Hyderabad", "Boriya", "ZZ Closed Depot", "-", ""],
+    "Crop.Name": ["Paddy", "Tomato", "Mango", "Common Crop", "Rootstock Tomato", "ZZ Old", "Wheat", ""],
+    "Activity.Name": ["All Activity", "Field Day", "Campaign", "Lab Operations QA", "Entomology", "CT", "ZZ Old", ""],
+    "Region.Name": ["FC Region North", "VC Region West", "RS Region Central", "Unmapped Region", "", None],
+    "Zone.Name": ["FC Zone 1", "VC Zone 1", "RS Zone 1", "Production FC Zone A", "Unmapped Zone", "", None],
+    "Business Unit.Name": ["FC BU Maharashtra", "VC BU Karnataka", "RS BU Central", "Unmapped BU", "", None],
+    "Account.Code": ["410001", "410004", "510001"],
+}
+
+@pytest.fixture(autouse=True)
+def references(monkeypatch):
+    monkeypatch.setattr(rules, "ref_files", {key: frozenset(values) for key, values in reference_values.items()})
+
+def random_rows(rows, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(rows):
+        record = {column: rng.choice(values) for column, values in value_pools.items()}
+        record["Department.Name"] = rng.choice(departments)
+        if record["Department.Name"] == "Sales" and rng.random() < 0.7:
+            record["Sub Department.Name"] = "Sales Brand"
+        records.append(record)
+    return pd.DataFrame(records, columns=["Department.Name"] + list(value_pools))
+
+def write_reference_workbooks(directory):
+    # The reference workbooks holding reference_values
+    os.makedirs(directory, exist_ok=True)
+    for key, (file_name, column) in config.reference_sources.items():
+        wb = Workbook()
+        wb.active.append([column])
+        for value in reference_values[key]:
+            wb.active.append([value])
+        wb.save(os.path.join(directory, file_name))
@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from expense_validation import columnar
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow", "csv"])
+def test_mixed_categorical_round_trip(tmp_path, file_format):
+    if file_format != "csv":
+        pytest.importorskip("pyarrow")
+    frames = {
+        "Sales": pd.DataFrame({"Department.Name": ["Sales", "Sales"], "Function.Name": [" Supply Chain", 42],
+                               "Exception Reasons": ["Incorrect Function Name", "Incorrect Function Name; Location Name Missing"]}),
+        "Breeding": pd.DataFrame({"Department.Name": ["Breeding"], "Function.Name": [7],
+                                  "Exception Reasons": ["Incorrect Function Name"]}),
+    }
+    # Departments are slices of one input, so they share its categories
+    functions = pd.CategoricalDtype([" Supply Chain", 42, 7])
+    for frame in frames.values():
+        frame["Function.Name"] = frame["Function.Name"].astype(functions)
+    manifest = {"format": file_format, "input_columns": ["Department.Name", "Function.Name"], "datasets": {}}
+    manifest["datasets"]["exceptions"] = columnar.write_columnar_dataset(str(tmp_path / "exceptions"), frames, file_format)
+    result = columnar.read_columnar_dataset(str(tmp_path), "exceptions", manifest)
+    assert list(result) == ["Sales", "Breeding"]
+    for dept, frame in frames.items():
+        assert result[dept]["Function.Name"].astype(str).tolist() == frame["Function.Name"].astype(str).tolist()
+        assert result[dept]["Exception Reasons"].tolist() == frame["Exception Reasons"].tolist()
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from expense_validation import history, pipeline, reports
+from conftest import random_rows
+
+def run_result(rows, seed):
+    df = random_rows(rows, seed)
+    df["Created user"] = [f"user{number % 4}" for number in range(rows)]
+    df["Modified user"] = [f"user{number % 3}" for number in range(rows)]
+    df["Net amount"] = [number * 12.5 - 300 for number in range(rows)]
+    return pipeline.validate(df, workers=1)
+
+def memory_summary(*results):
+    totals = None
+    for result in results:
+        totals = reports.combine_summary_totals(totals, reports.summary_totals(result.exceptions, result.exception_codes))
+    user_counts, error_totals, detailed_totals = totals
+    return user_counts, reports.reason_totals(error_totals), reports.reason_totals(detailed_totals)
+
+def assert_summaries_equal(summary, expected):
+    for frame, expected_frame in zip(summary, expected):
+        assert not expected_frame.empty
+        pd.testing.assert_frame_equal(frame.sort_index(), expected_frame.sort_index(), check_dtype=False)
+
+@pytest.fixture
+def connection(tmp_path):
+    connection = history.connect_history(str(tmp_path / "history.sqlite"))
+    yield connection
+    connection.close()
+
+def test_date_range_summary_matches_summary_totals(tmp_path, connection):
+    path = str(tmp_path / "history.sqlite")
+    first, second, outside = run_result(600, 11), run_result(400, 12), run_result(300, 13)
+    history.record_run(first, "first.xlsx", "2024-04-01", path)
+    history.record_run(second, "second.xlsx", "2024-04-02", path)
+    history.record_run(outside, "first.xlsx", "2024-04-05", path)
+    assert_summaries_equal(history.history_summary(connection, "2024-04-01", "2024-04-02"), memory_summary(first, second))
+    assert_summaries_equal(history.history_summary(connection, "2024-04-02", "2024-04-05"), memory_summary(second, outside))
+    exceptions = sum(map(len, first.exceptions.values())) + sum(map(len, second.exceptions.values()))
+    assert history.history_runs(connection, "2024-04-01", "2024-04-02") == (2, exceptions)
+    assert history.history_summary(connection, "2024-05-01", "2024-05-31") == (None, None, None)
+
+def test_recording_a_run_date_again_replaces_it(tmp_path, connection):
+    path = str(tmp_path / "history.sqlite")
+    earlier, later = run_result(600, 21), run_result(300, 22)
+    history.record_run(earlier, "daily.xlsx", "2024-04-01", path)
+    history.record_run(later, "daily.xlsx", "2024-04-01", path)
+    assert history.history_runs(connection, "2024-04-01", "2024-04-01") == (1, sum(map(len, later.exceptions.values())))
+    assert_summaries_equal(history.history_summary(connection, "2024-04-01", "2024-04-01"), memory_summary(later))
+    # No exception or total of the earlier run is left behind
+    for table in ("exceptions", "user_totals", "reason_totals"):
+        assert connection.execute(f"SELECT COUNT(DISTINCT run_id) FROM {table}").fetchone()[0] == 1
@@ -0,0 +1,38 @@
+import pytest
+
+from expense_validation import metrics
+from expense_validation.metrics import pipeline_metrics, pipeline_stage
+from expense_validation.parallel import JobScheduler
+
+size = 256 * 1024 * 1024
+
+def allocate():
+    data = bytearray(size)
+    data[::4096] = b"\1" * len(data[::4096])
+    del data
+
+@pytest.fixture(autouse=True)
+def stage_memory(monkeypatch):
+    if not metrics.reset_peak_memory():
+        pytest.skip("per-stage peak memory needs /proc/self/clear_refs")
+    monkeypatch.setitem(pipeline_metrics, "stages", [])
+
+def test_stage_peak_memory_is_per_stage():
+    with pipeline_stage("large", 0):
+        allocate()
+    with pipeline_stage("small", 0):
+        pass
+    large, small = pipeline_metrics["stages"]
+    assert large["peak_memory_bytes"] - small["peak_memory_bytes"] > size / 2
+    assert small["max_rss_bytes"] >= large["max_rss_bytes"] >= large["peak_memory_bytes"]
+
+def test_job_peak_memory():
+    with JobScheduler(2) as scheduler:
+        scheduler.submit("large", 0, allocate)
+    with JobScheduler(2) as scheduler:
+        scheduler.submit("small", 0, int)
+    large, small = pipeline_metrics["stages"]
+    if not large.get("concurrent"):
+        pytest.skip("jobs run in this process without fork")
+    assert large["peak_memory_bytes"] - small["peak_memory_bytes"] > size / 2
+    assert small["max_rss_bytes"] >= large["peak_memory_bytes"]
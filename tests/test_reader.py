@@ -0,0 +1,67 @@
+import re
+import zipfile
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from expense_validation import config, reader
+
+def write_input_workbook(path, rows=400):
+    # Shared strings, numbers, dates, numeric text and blank cells and rows;
+    # the Location.Name column is then rewritten as inline strings
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Department.Name", "Net amount", "Location.Name", "Date", "Account.Code", "Zone.Name"])
+    start = datetime(2024, 4, 1, 9, 30)
+    locations = {}
+    for number in range(rows):
+        if number % 97 == 50:
+            ws.append([])
+            continue
+        locations[number + 2] = f"Depot & Store {number % 13}"
+        ws.append([
+            ["Sales", "Breeding", "Processing"][number % 3],
+            number * 10.5 if number % 4 else number,
+            locations[number + 2],
+            start + timedelta(days=number, hours=number % 5) if number % 11 else None,
+            f"{number % 7:06d}" if number % 2 else 410000 + number,
+            None if number % 3 else f"Zone {number % 5}",
+        ])
+    wb.save(path)
+    with zipfile.ZipFile(path) as src:
+        parts = {name: src.read(name) for name in src.namelist()}
+    sheet = parts["xl/worksheets/sheet1.xml"].decode()
+    for row_number, location in locations.items():
+        text = location.replace("&", "&amp;")
+        sheet, count = re.subn(rf'<c r="C{row_number}"[^>]*>.*?</c>',
+                               f'<c r="C{row_number}" t="inlineStr"><is><t>{text}</t></is></c>', sheet)
+        assert count == 1
+    parts["xl/worksheets/sheet1.xml"] = sheet.encode()
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as dst:
+        for name, data in parts.items():
+            dst.writestr(name, data)
+
+@pytest.fixture
+def input_workbook(tmp_path):
+    path = str(tmp_path / "input.xlsx")
+    write_input_workbook(path)
+    return path
+
+@pytest.mark.parametrize("workers,chunk_bytes", [(1, None), (2, None), (1, 512), (3, 512)])
+def test_read_input_file_matches_read_excel(input_workbook, workers, chunk_bytes):
+    expected = pd.read_excel(input_workbook)
+    assert expected["Location.Name"].count() == expected["Department.Name"].count() > 0
+    pd.testing.assert_frame_equal(reader.read_input_file(input_workbook, workers, chunk_bytes), expected)
+
+def test_chunk_bytes_follows_config(monkeypatch, input_workbook):
+    chunk_sizes = []
+    iter_row_chunks = reader.iter_row_chunks
+    def recording_chunks(src, buffer, prefix, chunk_bytes):
+        chunk_sizes.append(chunk_bytes)
+        return iter_row_chunks(src, buffer, prefix, chunk_bytes)
+    monkeypatch.setattr(reader, "iter_row_chunks", recording_chunks)
+    monkeypatch.setattr(config, "input_chunk_bytes", 1024)
+    reader.read_input_file(input_workbook)
+    assert chunk_sizes == [1024]
@@ -0,0 +1,77 @@
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from expense_validation import config, reports
+
+def test_sheet_title():
+    used = {reports.index_sheet.lower()}
+    assert reports.sheet_title("Sales", used) == "Sales"
+    assert reports.sheet_title("SALES", used) == "SALES (2)"
+    assert reports.sheet_title("Index", used) == "Index (2)"
+    assert reports.sheet_title("R&D: Trials/QA [old]?", used) == "R&D_ Trials_QA _old__"
+    long_name = "In Licensing & Procurement Department"
+    assert reports.sheet_title(long_name, used) == long_name[:31]
+    assert reports.sheet_title(long_name, used) == long_name[:27] + " (2)"
+    assert reports.sheet_title("", used) == "Sheet"
+
+def exception_frames():
+    names = ["Sales", "In Licensing & Procurement Department", "In Licensing & Procurement Dept", "R&D/QA", "Index", "Empty"]
+    frames = {}
+    for number, name in enumerate(names):
+        rows = 0 if name == "Empty" else 5 + 6 * number
+        frames[name] = pd.DataFrame({
+            "Department.Name": [name] * rows,
+            "Net amount": [row * 1.5 for row in range(rows)],
+            "Created user": [f"user{row % 3}" for row in range(rows)],
+            "Exception Reasons": ["Location Name Missing"] * rows,
+        })
+    return frames
+
+def test_sharded_report_round_trip(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "report_sheet_rows", 7)
+    monkeypatch.setattr(config, "report_file_cells", 100)
+    frames = exception_frames()
+    path = str(tmp_path / "Exception_Report.xlsx")
+    paths = reports.write_report(path, list(frames.items()))
+    assert len(paths) > 2
+    assert all(os.path.exists(file_path) for file_path in paths)
+    index = pd.read_excel(path, sheet_name=reports.index_sheet)
+    assert index["Rows"].max() <= 7
+    assert index.groupby("Name", sort=False)["Rows"].sum().to_dict() == {name: len(frame) for name, frame in frames.items()}
+
+    result = reports.read_exception_report(path)
+    assert list(result) == list(frames)
+    for name, frame in frames.items():
+        pd.testing.assert_frame_equal(result[name].reset_index(drop=True), frame, check_dtype=False, check_index_type=False)
+
+    # A smaller report drops the numbered files of the larger one
+    monkeypatch.setattr(config, "report_file_cells", 50000000)
+    assert reports.write_report(path, list(frames.items())) == [path]
+    assert not os.path.exists(paths[1])
+    assert list(reports.read_exception_report(path)) == list(frames)
+
+def test_report_cell_styles(tmp_path):
+    frame = pd.DataFrame({
+        "Department.Name": ["Sales", "Breeding"],
+        "Net amount": [1250.5, -30.0],
+        "Date": pd.to_datetime(["2024-04-01", "2024-04-02"]),
+        "Created date": pd.to_datetime(["2024-04-01 09:30:00", "2024-04-02 17:05:00"]),
+        "Modified date": [None, None],
+        "Posted": pd.to_datetime(["2024-04-01 09:30:00", "2024-04-02 17:05:00"]),
+    })
+    path = str(tmp_path / "Report.xlsx")
+    reports.write_report(path, [("Sales", frame)])
+    ws = load_workbook(path)["Sales"]
+    expected = ["Report Cell", "Report Amount", "Report Date", "Report Date", "Report Date", "Report Datetime"]
+    assert [cell.style for cell in ws[1]] == ["Report Header"] * len(expected)
+    assert [cell.value for cell in ws[1]] == list(frame.columns)
+    header = ws["A1"]
+    assert header.font.bold and header.fill.fgColor.rgb == "00D3D3D3" and header.border.left.style == "thin"
+    for row in ws.iter_rows(min_row=2):
+        assert [cell.style for cell in row] == expected
+        assert [cell.number_format for cell in row] == ["General", "#,##0.00", "DD/MM/YYYY", "DD/MM/YYYY", "DD/MM/YYYY", "YYYY-MM-DD HH:MM:SS"]
+        assert all(cell.border.left.style == "thin" and cell.alignment.horizontal == "left" for cell in row)
+    assert ws["B2"].value == 1250.5 and ws["E2"].value is None
+    assert ws.column_dimensions["A"].width == len("Department.Name") + 2
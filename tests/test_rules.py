@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from expense_validation import config, engine, rules
+from conftest import random_rows
+
+def row_reasons(df):
+    return ["; ".join(rules.validate_row(row["Department.Name"], row)) for _, row in df.iterrows()]
+
+def test_validate_frame_matches_validate_row():
+    df = random_rows(5000)
+    expected = row_reasons(df)
+    assert sum("; " in reasons for reasons in expected) > 1000
+    for dept, dept_df in df.groupby("Department.Name", sort=False):
+        codes, order = rules.validate_frame(dept, dept_df)
+        rendered = rules.render_reasons(codes, order)
+        assert [expected[i] for i in dept_df.index] == list(rendered), dept
+
+def test_sales_brand_reasons_keep_row_order():
+    df = pd.DataFrame([{
+        "Department.Name": "Sales", "Sub Department.Name": "Sales Brand", "Function.Name": "Sales and Marketing",
+        "FC-Vertical.Name": vertical, "Location.Name": "Hyderabad", "Crop.Name": "Tomato", "Activity.Name": "Field Day",
+        "Region.Name": "Unmapped Region", "Zone.Name": "", "Business Unit.Name": "Unmapped BU", "Account.Code": "510001",
+    } for vertical in ["VC-Veg Crop", "Root Stock", "FC-field crop"]])
+    codes, order = rules.validate_frame("Sales", df)
+    assert list(rules.render_reasons(codes, order)) == row_reasons(df)
+
+@pytest.mark.parametrize("validation_engine,memoize", [("vectorized", False), ("vectorized", True), ("row", True)])
+def test_engines_match_row_engine(monkeypatch, validation_engine, memoize):
+    df = random_rows(3000, seed=1)
+    columns = df.columns.tolist()
+    monkeypatch.setattr(config, "validation_engine", "row")
+    monkeypatch.setattr(config, "memoize_combinations", False)
+    expected = engine.validate_departments(df, columns)[1]
+    monkeypatch.setattr(config, "validation_engine", validation_engine)
+    monkeypatch.setattr(config, "memoize_combinations", memoize)
+    engine.combination_cache.clear()
+    result = engine.validate_departments(df, columns)[1]
+    for dept, exception_df in expected.items():
+        assert result[dept]['Exception Reasons'].tolist() == exception_df['Exception Reasons'].tolist(), dept
+        # The row engine numbers its exception rows afresh
+        pd.testing.assert_frame_equal(result[dept][columns].reset_index(drop=True).astype(object),
+                                      exception_df[columns].reset_index(drop=True).astype(object))
+
+def test_incremental_row_engine(monkeypatch, tmp_path):
+    df = random_rows(2000, seed=2)
+    columns = df.columns.tolist()
+    state_file = str(tmp_path / "state.pkl")
+    monkeypatch.setattr(config, "validation_engine", "row")
+    monkeypatch.setattr(config, "memoize_combinations", False)
+    expected = engine.validate_departments(df, columns)[1]
+    engine.validate_departments(df, columns, state_file=state_file)
+    assert engine.pipeline_metrics["incremental"] == {"enabled": False}
+    monkeypatch.setattr(config, "memoize_combinations", True)
+    for reused_rows in (0, len(df)):
+        engine.combination_cache.clear()
+        result = engine.validate_departments(df, columns, state_file=state_file)[1]
+        assert engine.pipeline_metrics["incremental"] == {"enabled": True, "reused_rows": reused_rows}
+        for dept, exception_df in expected.items():
+            assert result[dept]['Exception Reasons'].tolist() == exception_df['Exception Reasons'].tolist(), dept
+
+def test_memoized_row_engine_rule_metrics(monkeypatch):
+    # Each department validates its combinations once, so both engines report
+    # the same evaluations and hits for every rule
+    df = random_rows(3000, seed=3)
+    columns = df.columns.tolist()
+    monkeypatch.setattr(config, "memoize_combinations", True)
+    department_rules = {}
+    for validation_engine in ("vectorized", "row"):
+        monkeypatch.setattr(config, "validation_engine", validation_engine)
+        engine.combination_cache.clear()
+        engine.validate_departments(df, columns)
+        department_rules[validation_engine] = {
+            metrics["department"]: {rule["rule"]: (rule["evaluations"], rule["hits"]) for rule in metrics["rules"]}
+            for metrics in engine.pipeline_metrics["departments"]
+        }
+    assert department_rules["row"] == department_rules["vectorized"]
@@ -0,0 +1,65 @@
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+from expense_validation import config, reader, snapshots
+from expense_validation.metrics import pipeline_metrics
+from conftest import random_rows
+
+pytest.importorskip("pyarrow")
+
+@pytest.fixture
+def snapshot_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "input_snapshot_dir", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(config, "input_read_workers", 1)
+    return tmp_path / "snapshots"
+
+def write_input(path, seed):
+    df = random_rows(300, seed)
+    df.to_excel(path, index=False)
+
+def test_snapshot_hit_and_miss(snapshot_dir, tmp_path):
+    path = str(tmp_path / "input.xlsx")
+    write_input(path, 1)
+    parsed = reader.read_input(path)
+    assert pipeline_metrics["input_snapshot"]["hit"] is False
+    assert len(glob.glob(str(snapshot_dir / "*.arrow"))) == 1
+    loaded = reader.read_input(path)
+    assert pipeline_metrics["input_snapshot"]["hit"] is True
+    pd.testing.assert_frame_equal(loaded, parsed)
+    # Other content is another snapshot
+    write_input(path, 2)
+    reader.read_input(path)
+    assert pipeline_metrics["input_snapshot"]["hit"] is False
+    assert len(glob.glob(str(snapshot_dir / "*.arrow"))) == 2
+    assert not glob.glob(str(snapshot_dir / "*.tmp"))
+
+def test_snapshot_keeps_other_writers_files(snapshot_dir):
+    # Another worker's half-written snapshot of the same input is left alone
+    digest = "0" * 40
+    os.makedirs(snapshot_dir)
+    other = snapshots.snapshot_path(digest) + ".tmp"
+    with open(other, "wb") as f:
+        f.write(b"half written")
+    df = pd.DataFrame({"Department.Name": ["Sales", "Breeding"], "Net amount": [1.5, 2.0]})
+    snapshots.save_snapshot(digest, df)
+    with open(other, "rb") as f:
+        assert f.read() == b"half written"
+    pd.testing.assert_frame_equal(snapshots.load_snapshot(digest), df)
+
+def test_snapshot_eviction(monkeypatch, snapshot_dir):
+    frames = {digest: pd.DataFrame({"Department.Name": [digest] * 1000, "Net amount": range(1000)}) for digest in "abc"}
+    snapshots.save_snapshot("a", frames["a"])
+    size = os.path.getsize(snapshots.snapshot_path("a"))
+    monkeypatch.setattr(config, "input_snapshot_max_bytes", 2 * size)
+    snapshots.save_snapshot("b", frames["b"])
+    os.utime(snapshots.snapshot_path("a"), (1, 1))
+    os.utime(snapshots.snapshot_path("b"), (2, 2))
+    # Loading a snapshot marks it as recently used, so b is evicted for c
+    assert snapshots.load_snapshot("a") is not None
+    snapshots.save_snapshot("c", frames["c"])
+    assert sorted(os.path.basename(path) for path in glob.glob(str(snapshot_dir / "*.arrow"))) == ["a.arrow", "c.arrow"]
+    assert snapshots.load_snapshot("b") is None
+    assert pipeline_metrics["input_snapshot"] == {"hit": False}
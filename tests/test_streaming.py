@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from expense_validation import config, pipeline, streaming
+from expense_validation.metrics import pipeline_metrics
+from expense_validation.reports import read_exception_report
+from conftest import random_rows
+
+@pytest.fixture
+def input_file(monkeypatch, tmp_path):
+    for name in ("exception_file", "summary_file", "correction_file", "all_depts_file", "common_usage_file",
+                 "columnar_output_dir", "validation_state_file"):
+        monkeypatch.setattr(config, name, getattr(config, name))
+    monkeypatch.setattr(config, "metrics_file", None)
+    monkeypatch.setattr(config, "history_file", None)
+    monkeypatch.setattr(config, "input_snapshot_dir", None)
+    monkeypatch.setattr(config, "output_format", "excel")
+    monkeypatch.setattr(config, "input_read_workers", 1)
+    monkeypatch.setattr(config, "report_workers", 1)
+    df = random_rows(1200, seed=5)
+    df = df[df["Department.Name"].isin(["Sales", "Production", "Quality Assurance", "Breeding", "Marketing"])]
+    df = df.reset_index(drop=True)
+    df["Created user"] = [f"user{number % 4}" for number in range(len(df))]
+    df["Modified user"] = [f"user{number % 3}" for number in range(len(df))]
+    df["Net amount"] = [number * 12.5 - 300 for number in range(len(df))]
+    path = str(tmp_path / "input.xlsx")
+    df.to_excel(path, index=False)
+    return path
+
+def test_streaming_matches_in_memory_pipeline(monkeypatch, tmp_path, input_file):
+    config.set_output_dir(str(tmp_path / "memory"))
+    (tmp_path / "memory").mkdir()
+    pipeline.write_reports(pipeline.validate(input_file, workers=1))
+    expected = read_exception_report(config.exception_file)
+    expected_summary = pd.read_excel(config.summary_file, sheet_name=None)
+
+    # Small chunks, so every department's rows come from several of them
+    monkeypatch.setattr(streaming, "first_chunk_rows", 50)
+    monkeypatch.setattr(config, "streaming_memory_budget", 400000)
+    config.set_output_dir(str(tmp_path / "streaming"))
+    (tmp_path / "streaming").mkdir()
+    assert streaming.stream_reports(input_file, workers=1) == pd.read_excel(input_file).shape[0]
+    assert pipeline_metrics["streaming"]["chunks"] > 4
+
+    result = read_exception_report(config.exception_file)
+    assert list(result) == list(expected)
+    for dept, frame in expected.items():
+        pd.testing.assert_frame_equal(result[dept], frame)
+    summary = pd.read_excel(config.summary_file, sheet_name=None)
+    assert list(summary) == list(expected_summary)
+    for sheet, frame in expected_summary.items():
+        pd.testing.assert_frame_equal(summary[sheet], frame)
@@ -0,0 +1,67 @@
+import pandas as pd
+
+from expense_validation import config, pipeline, rules, suggestions
+from expense_validation.reports import write_report, build_correction_entries
+from conftest import random_rows, write_reference_workbooks
+
+# Rows whose values are close to a reference entry
+typo_rows = pd.DataFrame([
+    {"Department.Name": "Production", "Sub Department.Name": "Commercial Seed Production", "Function.Name": "Supply Chain",
+     "FC-Vertical.Name": "FC-field crop", "Location.Name": "Hyderabad", "Crop.Name": "Pady", "Activity.Name": "All Activity",
+     "Zone.Name": "Production FC Zone", "Account.Code": "510001"},
+    {"Department.Name": "Sales", "Sub Department.Name": "Sales Brand", "Function.Name": "Sales and Marketing",
+     "FC-Vertical.Name": "VC-Veg Crop", "Location.Name": "Hyderabad", "Crop.Name": "ZZ Tomato", "Activity.Name": "Field Dya",
+     "Region.Name": "VC Regon West", "Zone.Name": "VC Zone1", "Business Unit.Name": "VC BU Karnatka", "Account.Code": "510001"},
+])
+
+def test_summarize_mode_keeps_suggestions(monkeypatch, tmp_path):
+    write_reference_workbooks(str(tmp_path / "Input file"))
+    monkeypatch.setattr(config, "input_path", str(tmp_path / "Input file"))
+    monkeypatch.setattr(config, "reference_cache_file", str(tmp_path / ".reference_cache.pkl"))
+    df = pd.concat([random_rows(300, seed=3), typo_rows], ignore_index=True)
+    pipeline.load_references()
+    result = pipeline.validate(df, workers=1)
+    expected = build_correction_entries(result.exceptions, result.input_columns)['Suggested Corrections']
+    assert (expected != "").sum() >= len(typo_rows)
+
+    path = str(tmp_path / "Exception_Report.xlsx")
+    write_report(path, [(str(dept), frame) for dept, frame in result.exceptions.items()])
+    monkeypatch.setattr(rules, "ref_files", {})
+    summarized = pipeline.load_exception_report(path)
+    assert rules.ref_files
+    suggestions = build_correction_entries(summarized.exceptions, summarized.input_columns)['Suggested Corrections']
+    assert suggestions.tolist() == expected.tolist()
+
+def test_edit_distance():
+    assert suggestions.edit_distance("paddy", "paddy") == 0
+    assert suggestions.edit_distance("pady", "paddy") == 1
+    assert suggestions.edit_distance("", "okra") == 4
+    assert suggestions.edit_distance("kitten", "sitting") == 3
+
+def test_suggest_closest_entry():
+    index = suggestions.SuggestionIndex(["Paddy", "Maize", "Production FC Zone A"])
+    assert index.suggest("Pady") == "Paddy"
+    assert index.suggest("  maize ") == "Maize"
+    assert index.suggest("Production FC Zone") == "Production FC Zone A"
+    assert index.suggest("") is None
+    assert index.suggest(None) is None
+
+def test_suggest_ignores_zz_prefix():
+    index = suggestions.SuggestionIndex(["Paddy", "Maize"])
+    assert index.suggest("ZZ Paddy") == "Paddy"
+    assert index.suggest("zz-Maize") == "Maize"
+
+def test_suggest_below_min_similarity(monkeypatch):
+    index = suggestions.SuggestionIndex(["Paddy", "Maize"])
+    assert index.suggest("Cotton") is None
+    monkeypatch.setattr(config, "suggestion_min_similarity", 0.9)
+    assert suggestions.SuggestionIndex(["Paddy", "Maize"]).suggest("Pady") is None
+
+def test_sales_brand_suggestions_follow_vertical():
+    # The same zone value is matched against its row's vertical list
+    entries = pd.DataFrame([
+        {"Department.Name": "Sales", "FC-Vertical.Name": vertical, "Zone.Name": "VC Zone1",
+         "Exception Reasons": f"Incorrect Zone Name for {label}"}
+        for vertical, (_, label) in rules.sales_brand_checks.items() if vertical != "Root Stock"
+    ])
+    assert suggestions.suggest_corrections(entries).tolist() == ["Zone.Name: FC Zone 1", "Zone.Name: VC Zone 1"]